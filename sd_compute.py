@@ -0,0 +1,830 @@
+"""
+Pure python computations used by the sd tools
+created by: Sean Disero
+
+Nothing in here imports maya, everything works on flat arrays read by sd_mesh_io,
+so it can be used anywhere the data can be handed over to.
+Run as a script it serves jobs to sd_mesh_pipeline, see serve.
+
+points and normals are flat xyz sequences.
+faces are described by (offsets, vertex_ids) where the vertices of face f are
+vertex_ids[offsets[f]:offsets[f + 1]].
+
+License: MIT
+"""
+
+import sys
+import math
+import heapq
+import random
+import copy_reg
+import traceback
+import cPickle as pickle
+from array import array
+
+
+def _array_from_string(typecode, data):
+    values = array(typecode)
+    values.fromstring(data)
+    return values
+
+
+# arrays pickle as a list of python numbers by default, send them to and from the workers as one block.
+copy_reg.pickle(array, lambda values: (_array_from_string, (values.typecode, values.tostring())))
+
+
+# extra room given to angle tolerances so (0, 0) still catches faces that are flat within float error.
+ANGLE_EPSILON = 0.01
+
+
+def face_normal(points, offsets, vertex_ids, f):
+    """
+    Area weighted normal of a face using Newell's method.
+    :return: (x, y, z), its length is twice the area of the face.
+    """
+    start = offsets[f]
+    end = offsets[f + 1]
+
+    nx = ny = nz = 0.0
+    prev = vertex_ids[end - 1] * 3
+    for k in range(start, end):
+        cur = vertex_ids[k] * 3
+        px, py, pz = points[prev], points[prev + 1], points[prev + 2]
+        cx, cy, cz = points[cur], points[cur + 1], points[cur + 2]
+        nx += (py - cy) * (pz + cz)
+        ny += (pz - cz) * (px + cx)
+        nz += (px - cx) * (py + cy)
+        prev = cur
+
+    return nx, ny, nz
+
+
+def normalize(vector):
+    x, y, z = vector
+    length = math.sqrt(x * x + y * y + z * z)
+    if length == 0:
+        return 0.0, 0.0, 0.0
+    return x / length, y / length, z / length
+
+
+def face_edges(offsets, vertex_ids, face_ids):
+    """
+    Maps every edge of the faces to the faces that use it.
+    :return: Dictionary of (low vertex, high vertex) to a list of face ids.
+    """
+    edges = {}
+    for f in face_ids:
+        start = offsets[f]
+        end = offsets[f + 1]
+        prev = vertex_ids[end - 1]
+        for k in range(start, end):
+            cur = vertex_ids[k]
+            key = (prev, cur) if prev < cur else (cur, prev)
+            edges.setdefault(key, []).append(f)
+            prev = cur
+    return edges
+
+
+class UnionFind(object):
+    """
+    Disjoint sets over integer ids with path halving and union by size.
+    """
+
+    def __init__(self, ids):
+        self.parent = dict((i, i) for i in ids)
+        self.size = dict((i, 1) for i in ids)
+
+    def find(self, i):
+        parent = self.parent
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(self, a, b):
+        a = self.find(a)
+        b = self.find(b)
+        if a == b:
+            return
+        if self.size[a] < self.size[b]:
+            a, b = b, a
+        self.parent[b] = a
+        self.size[a] += self.size[b]
+
+    def groups(self):
+        """
+        :return: List of lists of ids, ordered by their lowest id.
+        """
+        found = {}
+        for i in sorted(self.parent):
+            found.setdefault(self.find(i), []).append(i)
+        return sorted(found.values(), key=lambda group: group[0])
+
+
+def coplanar_regions(points, offsets, vertex_ids, face_ids, min_angle=0.0, max_angle=0.0):
+    """
+    Clusters connected faces into regions, two faces are joined when the angle between
+    their normals across a shared edge is inside the tolerance band.
+    :param min_angle: Smallest angle in degrees between faces that still joins them.
+    :param max_angle: Largest angle in degrees between faces that still joins them.
+    :return: List of (face ids, unit region normal, area) where the normal is the area weighted
+    average of the faces in the region.
+    """
+    normals = {}
+    for f in face_ids:
+        normals[f] = face_normal(points, offsets, vertex_ids, f)
+
+    unit = dict((f, normalize(n)) for f, n in normals.items())
+
+    # compare cosines instead of taking an acos per edge.
+    cos_low = math.cos(math.radians(min(max(max_angle + ANGLE_EPSILON, 0.0), 180.0)))
+    cos_high = math.cos(math.radians(min(max(min_angle - ANGLE_EPSILON, 0.0), 180.0)))
+
+    regions = UnionFind(face_ids)
+    for faces in face_edges(offsets, vertex_ids, face_ids).values():
+        if len(faces) != 2:
+            continue
+        a, b = faces
+        na = unit[a]
+        nb = unit[b]
+        if na == (0.0, 0.0, 0.0) or nb == (0.0, 0.0, 0.0):
+            continue
+        cos_angle = na[0] * nb[0] + na[1] * nb[1] + na[2] * nb[2]
+        if cos_low <= cos_angle <= cos_high:
+            regions.union(a, b)
+
+    result = []
+    for group in regions.groups():
+        sx = sy = sz = 0.0
+        for f in group:
+            n = normals[f]
+            sx += n[0]
+            sy += n[1]
+            sz += n[2]
+        area = 0.5 * sum(math.sqrt(normals[f][0] ** 2 + normals[f][1] ** 2 + normals[f][2] ** 2) for f in group)
+        result.append((group, normalize((sx, sy, sz)), area))
+
+    return result
+
+
+def region_vertex_normals(regions, offsets, vertex_ids):
+    """
+    Gives every vertex of every region that region's normal.
+    Where regions share a vertex the largest region wins, so the result does not depend on order.
+    :param regions: Result of coplanar_regions.
+    :return: Dictionary of vertex id to (x, y, z).
+    """
+    vertex_normals = {}
+    for faces, normal, area in sorted(regions, key=lambda region: (region[2], -region[0][0])):
+        for f in faces:
+            for k in range(offsets[f], offsets[f + 1]):
+                vertex_normals[vertex_ids[k]] = normal
+    return vertex_normals
+
+
+def flat_vertex_normals(points, offsets, vertex_ids, face_ids):
+    """
+    Gives the vertices of each face the normal of that face, where faces share a vertex the last face wins.
+    :return: Dictionary of vertex id to (x, y, z).
+    """
+    vertex_normals = {}
+    for f in face_ids:
+        normal = normalize(face_normal(points, offsets, vertex_ids, f))
+        for k in range(offsets[f], offsets[f + 1]):
+            vertex_normals[vertex_ids[k]] = normal
+    return vertex_normals
+
+
+def face_vertex_normals(offsets, vertex_ids, vertex_normals):
+    """
+    Spreads vertex normals out to every face vertex of those vertices.
+    :param vertex_normals: Dictionary of vertex id to (x, y, z).
+    :return: (face ids, vertex ids, flat xyz normals, indices) where indices are the
+        positions of the face vertices in vertex_ids, in the order of the face vertices.
+    """
+    face_ids = array('i')
+    edit_vertex_ids = array('i')
+    normals = array('f')
+    indices = array('i')
+    for f in range(len(offsets) - 1):
+        for k in range(offsets[f], offsets[f + 1]):
+            v = vertex_ids[k]
+            if v in vertex_normals:
+                face_ids.append(f)
+                edit_vertex_ids.append(v)
+                normals.extend(vertex_normals[v])
+                indices.append(k)
+    return face_ids, edit_vertex_ids, normals, indices
+
+
+def mesh_normal_job(job):
+    """
+    Works out the vertex normals for one mesh, this is what the worker processes run.
+    :param job: Dictionary made by sd_mesh_io.read_normal_job with
+        key - anything to tell the result apart.
+        mode - 'flat' for one normal per face, 'regions' for one normal per coplanar region.
+        points, offsets, vertex_ids - the mesh.
+        face_ids - the faces to work on.
+        min_tolerance, max_tolerance - angle band for joining regions.
+    :return: (key, face ids, vertex ids, flat xyz normals, indices) for every face vertex
+        that changes, see face_vertex_normals.
+    """
+    args = (job['points'], job['offsets'], job['vertex_ids'], job['face_ids'])
+    if job['mode'] == 'regions':
+        regions = coplanar_regions(*args, min_angle=job['min_tolerance'], max_angle=job['max_tolerance'])
+        vertex_normals = region_vertex_normals(regions, job['offsets'], job['vertex_ids'])
+    else:
+        vertex_normals = flat_vertex_normals(*args)
+
+    return (job['key'],) + face_vertex_normals(job['offsets'], job['vertex_ids'], vertex_normals)
+
+
+class SpatialHash(object):
+    """
+    Uniform grid over a set of points for fast neighbour lookups.
+    """
+
+    def __init__(self, points, cell_size):
+        self.points = points
+        self.cell_size = float(cell_size)
+        self.cells = {}
+
+        inv = 1.0 / self.cell_size
+        cells = self.cells
+        for i in range(len(points) // 3):
+            key = (
+                int(math.floor(points[i * 3] * inv)),
+                int(math.floor(points[i * 3 + 1] * inv)),
+                int(math.floor(points[i * 3 + 2] * inv))
+            )
+            bucket = cells.get(key)
+            if bucket is None:
+                cells[key] = array('i', [i])
+            else:
+                bucket.append(i)
+
+    def _ring(self, cx, cy, cz, ring):
+        """
+        The cells exactly ring cells away from (cx, cy, cz), the shell of a cube around it.
+        """
+        if ring == 0:
+            yield cx, cy, cz
+            return
+        for i in range(cx - ring, cx + ring + 1):
+            edge_i = i == cx - ring or i == cx + ring
+            for j in range(cy - ring, cy + ring + 1):
+                if edge_i or j == cy - ring or j == cy + ring:
+                    for k in range(cz - ring, cz + ring + 1):
+                        yield i, j, k
+                else:
+                    yield i, j, cz - ring
+                    yield i, j, cz + ring
+
+    def nearest(self, x, y, z, max_distance, accept=None):
+        """
+        Looks outward one ring of cells at a time, nearest points first, and stops at the first one accepted.
+        :param max_distance: Furthest a point can be.
+        :param accept: Function taking a point index, returns True if the point will do. Any point if None.
+        :return: (squared distance, point index) of the nearest accepted point, None if there isn't one.
+        """
+        inv = 1.0 / self.cell_size
+        reach = int(math.ceil(max_distance * inv))
+        cx = int(math.floor(x * inv))
+        cy = int(math.floor(y * inv))
+        cz = int(math.floor(z * inv))
+
+        points = self.points
+        cells = self.cells
+        limit = max_distance * max_distance
+        # points found so far, a ring further out could still hold one nearer than these.
+        pending = []
+        for ring in range(reach + 1):
+            for key in self._ring(cx, cy, cz, ring):
+                bucket = cells.get(key)
+                if bucket is None:
+                    continue
+                for p in bucket:
+                    dx = points[p * 3] - x
+                    dy = points[p * 3 + 1] - y
+                    dz = points[p * 3 + 2] - z
+                    dist = dx * dx + dy * dy + dz * dz
+                    if dist <= limit:
+                        heapq.heappush(pending, (dist, p))
+
+            # every point in the next ring is at least this far away.
+            closest_next = (ring * self.cell_size) ** 2
+            while pending and (ring == reach or pending[0][0] <= closest_next):
+                dist, p = heapq.heappop(pending)
+                if accept is None or accept(p):
+                    return dist, p
+        return None
+
+
+def auto_cell_size(points, face_ids=None):
+    """
+    The spacing of points on a surface, a cell this size holds a handful of them.
+    :param points: Flat xyz, eg. the positions of face vertices.
+    :param face_ids: The face of each point, the spacing is then the mean length of the face edges
+        between consecutive points. Worked out from the bounding box area if None or there are no edges.
+    """
+    count = len(points) // 3
+    if count == 0:
+        return 1.0
+
+    if face_ids is not None:
+        total = 0.0
+        edges = 0
+        for i in range(count - 1):
+            if face_ids[i] != face_ids[i + 1]:
+                continue
+            a = i * 3
+            dx = points[a + 3] - points[a]
+            dy = points[a + 4] - points[a + 1]
+            dz = points[a + 5] - points[a + 2]
+            length = math.sqrt(dx * dx + dy * dy + dz * dz)
+            if length:
+                total += length
+                edges += 1
+        if edges:
+            return max(total / edges, 1e-4)
+
+    # points lie on a surface, spread them over the area of the box instead of its volume.
+    low = [min(points[axis::3]) for axis in range(3)]
+    high = [max(points[axis::3]) for axis in range(3)]
+    sx, sy, sz = [h - l for h, l in zip(high, low)]
+    area = sx * sy + sy * sz + sz * sx
+    if area == 0:
+        return max(max(sx, sy, sz) / count, 1e-4)
+    return max(math.sqrt(area / count), 1e-4)
+
+
+def face_vertex_data(points, offsets, vertex_ids, normal_ids, normals, keep=None):
+    """
+    Lays out everything about the face vertices of a mesh as flat arrays, one entry per face vertex.
+    positions and normals keep the typecode they were read with, face normals are doubles.
+    :param normal_ids: The normal id of every face vertex.
+    :param normals: Flat xyz by normal id.
+    :param keep: Function taking a normal id, only face vertices it returns True for are kept. All if None.
+    :return: Dictionary of
+        face_ids, vertex_ids - which face and vertex each face vertex is.
+        positions - xyz of the vertex.
+        face_normals - unit xyz normal of the face.
+        normals - xyz of the face vertex normal.
+    """
+    face_ns = face_normals(points, offsets, vertex_ids)
+    data = {
+        'face_ids': array('i'),
+        'vertex_ids': array('i'),
+        'positions': array(getattr(points, 'typecode', 'd')),
+        'face_normals': array(face_ns.typecode),
+        'normals': array(getattr(normals, 'typecode', 'd')),
+    }
+
+    for f in range(len(offsets) - 1):
+        face_n = face_ns[f * 3:f * 3 + 3]
+        for k in range(offsets[f], offsets[f + 1]):
+            normal_id = normal_ids[k]
+            if keep is not None and not keep(normal_id):
+                continue
+            v = vertex_ids[k]
+            data['face_ids'].append(f)
+            data['vertex_ids'].append(v)
+            data['positions'].extend(points[v * 3:v * 3 + 3])
+            data['face_normals'].extend(face_n)
+            data['normals'].extend(normals[normal_id * 3:normal_id * 3 + 3])
+
+    return data
+
+
+def transfer_normals(source, target, max_distance=None, min_dot=0.5):
+    """
+    Matches every target face vertex to the nearest source vertex with a face that
+    points the same way and takes the normal of that face vertex.
+    source and target are dictionaries of flat arrays, see face_vertex_data:
+        positions - xyz of each face vertex.
+        face_normals - unit xyz normal of the face each face vertex belongs to.
+        vertex_ids - the vertex each face vertex belongs to.
+        face_ids - the face each face vertex belongs to, only needed for the source.
+    the source also needs normals - the xyz normal to transfer for each face vertex.
+    :param max_distance: Furthest a match can be, twice the source edge length if None.
+    :param min_dot: Smallest dot product between source and target face normals for a match.
+    :return: (target face vertex indices, normals) of every face vertex that found a match.
+    """
+    src_positions = source['positions']
+    src_vertex_ids = source['vertex_ids']
+    src_face_normals = source['face_normals']
+    src_normals = source['normals']
+
+    # the face vertices of a vertex share its position, the grid holds each vertex once.
+    slots = {}
+    points = array(getattr(src_positions, 'typecode', 'd'))
+    members = []
+    for i, v in enumerate(src_vertex_ids):
+        slot = slots.get(v)
+        if slot is None:
+            slot = slots[v] = len(members)
+            members.append(array('i'))
+            points.extend(src_positions[i * 3:i * 3 + 3])
+        members[slot].append(i)
+    del slots
+
+    cell_size = auto_cell_size(src_positions, source.get('face_ids'))
+    if max_distance is None:
+        max_distance = cell_size * 2.0
+    # a far reaching search on small cells would look through lots of empty ones, keep it to a few rings.
+    grid = SpatialHash(points, max(cell_size, max_distance / 4.0))
+
+    dst_positions = target['positions']
+    dst_face_normals = target['face_normals']
+
+    matched = array('i')
+    normals = array(getattr(src_normals, 'typecode', 'f'))
+
+    # face normal of the target face vertex being matched, and the source face vertex picked for it.
+    face_n = [0.0, 0.0, 0.0]
+    best = [None]
+
+    def faces_agree(slot):
+        fx, fy, fz = face_n
+        best_dot = min_dot
+        best[0] = None
+        for p in members[slot]:
+            dot = (
+                src_face_normals[p * 3] * fx +
+                src_face_normals[p * 3 + 1] * fy +
+                src_face_normals[p * 3 + 2] * fz
+            )
+            if dot >= best_dot:
+                best_dot = dot
+                best[0] = p
+        return best[0] is not None
+
+    for i in range(len(dst_positions) // 3):
+        face_n[:] = dst_face_normals[i * 3:i * 3 + 3]
+        found = grid.nearest(
+            dst_positions[i * 3], dst_positions[i * 3 + 1], dst_positions[i * 3 + 2], max_distance, faces_agree
+        )
+        if found is not None:
+            p = best[0]
+            matched.append(i)
+            normals.extend(src_normals[p * 3:p * 3 + 3])
+
+    return matched, normals
+
+
+def transfer_job(job):
+    """
+    Transfers normals onto one mesh, this is what the worker processes run for a transfer.
+    :param job: Dictionary made by sd_mesh_io.read_transfer_job with
+        key - anything to tell the result apart.
+        source, target - face vertex data, see transfer_normals.
+        max_distance, min_dot - see transfer_normals.
+    :return: (key, face ids, vertex ids, flat xyz normals) of every target face vertex that found a match.
+    """
+    target = job['target']
+    matched, normals = transfer_normals(job['source'], target, job['max_distance'], job['min_dot'])
+    return (
+        job['key'],
+        array('i', [target['face_ids'][i] for i in matched]),
+        array('i', [target['vertex_ids'][i] for i in matched]),
+        normals
+    )
+
+
+def reduce_keys(times, values, tolerance):
+    """
+    Drops keys that a straight line between the kept keys already passes within tolerance of,
+    using Ramer-Douglas-Peucker on the curve values.
+    :param times: Key times, ascending.
+    :param values: Key values.
+    :param tolerance: Largest value difference allowed for a dropped key.
+    :return: (times, values) of the kept keys.
+    """
+    count = len(times)
+    if count < 3 or tolerance is None:
+        return list(times), list(values)
+
+    keep = [False] * count
+    keep[0] = keep[-1] = True
+
+    stack = [(0, count - 1)]
+    while stack:
+        first, last = stack.pop()
+        t0, v0 = times[first], values[first]
+        t1, v1 = times[last], values[last]
+        span = float(t1 - t0)
+
+        worst = None
+        worst_error = tolerance
+        for i in range(first + 1, last):
+            expected = v0 + (v1 - v0) * ((times[i] - t0) / span) if span else v0
+            error = abs(values[i] - expected)
+            if error > worst_error:
+                worst = i
+                worst_error = error
+
+        if worst is not None:
+            keep[worst] = True
+            stack.append((first, worst))
+            stack.append((worst, last))
+
+    return (
+        [t for t, k in zip(times, keep) if k],
+        [v for v, k in zip(values, keep) if k]
+    )
+
+
+class SphereGrid(object):
+    """
+    Hash grids of spheres, one per radius class where each class holds radii within a power of two.
+    Every grid's cells are sized for its own class, so one big sphere doesn't
+    make the cells of all the small ones big too.
+    """
+
+    def __init__(self):
+        # class: (cell size, {cell: [sphere ids]})
+        self.grids = {}
+        self.centers = array('d')
+        self.radii = array('d')
+
+    @staticmethod
+    def _radius_class(radius):
+        return int(math.floor(math.log(max(radius, 1e-6), 2)))
+
+    def add(self, x, y, z, radius):
+        k = self._radius_class(radius)
+        if k not in self.grids:
+            # radii in class k are below 2 ** (k + 1), the cells fit two of the largest.
+            self.grids[k] = (2.0 ** (k + 2), {})
+        cell, cells = self.grids[k]
+        key = (int(math.floor(x / cell)), int(math.floor(y / cell)), int(math.floor(z / cell)))
+        cells.setdefault(key, []).append(len(self.radii))
+        self.centers.extend((x, y, z))
+        self.radii.append(radius)
+
+    def _touches(self, ids, x, y, z, radius):
+        centers = self.centers
+        radii = self.radii
+        for p in ids:
+            ox = centers[p * 3] - x
+            oy = centers[p * 3 + 1] - y
+            oz = centers[p * 3 + 2] - z
+            reach = radii[p] + radius
+            if ox * ox + oy * oy + oz * oz < reach * reach:
+                return True
+        return False
+
+    def overlaps(self, x, y, z, radius):
+        """
+        :return: True if the sphere touches any sphere added so far.
+        """
+        for cell, cells in self.grids.values():
+            # the largest sphere in a grid is half a cell across, look that far plus our own radius.
+            span = int(math.ceil((radius + 0.5 * cell) / cell))
+            if (2 * span + 1) ** 3 > len(cells):
+                # a big sphere against a grid of small ones, fewer cells are used than would be looked at.
+                for ids in cells.values():
+                    if self._touches(ids, x, y, z, radius):
+                        return True
+                continue
+
+            gx = int(math.floor(x / cell))
+            gy = int(math.floor(y / cell))
+            gz = int(math.floor(z / cell))
+            for a in range(gx - span, gx + span + 1):
+                for b in range(gy - span, gy + span + 1):
+                    for c in range(gz - span, gz + span + 1):
+                        ids = cells.get((a, b, c))
+                        if ids and self._touches(ids, x, y, z, radius):
+                            return True
+        return False
+
+
+def scatter(centers, radii, ranges, seed=None, attempts=30):
+    """
+    Poisson disc style dart throwing, every object tries random offsets inside its range
+    until it finds one where its bounding sphere doesn't touch any object placed before it.
+    placed objects are kept in a SphereGrid, so each try only checks the cells around it.
+    :param centers: Flat xyz of each object's bounding sphere center.
+    :param radii: Bounding sphere radius of each object.
+    :param ranges: (x, y, z) furthest an object can be offset along each axis, in both directions.
+    :param seed: Seed for the random numbers.
+    :param attempts: Tries per object before giving up on it.
+    :return: (flat xyz offsets, indices of the objects that couldn't be placed)
+    the objects that couldn't be placed are given no offset, and the objects after them keep clear of them.
+    """
+    rng = random.Random(seed)
+
+    count = len(radii)
+    offsets = array('d', [0.0]) * (count * 3)
+    failed = []
+    grid = SphereGrid()
+
+    rx, ry, rz = ranges
+    # with no range there is only the one position to try.
+    tries = attempts if (rx or ry or rz) else 1
+    for i in range(count):
+        cx, cy, cz = centers[i * 3], centers[i * 3 + 1], centers[i * 3 + 2]
+        radius = radii[i]
+
+        for attempt in range(tries):
+            dx = rng.uniform(-rx, rx) if rx else 0.0
+            dy = rng.uniform(-ry, ry) if ry else 0.0
+            dz = rng.uniform(-rz, rz) if rz else 0.0
+
+            if not grid.overlaps(cx + dx, cy + dy, cz + dz, radius):
+                grid.add(cx + dx, cy + dy, cz + dz, radius)
+                offsets[i * 3] = dx
+                offsets[i * 3 + 1] = dy
+                offsets[i * 3 + 2] = dz
+                break
+        else:
+            # it stays where it is, so it still takes up that space.
+            grid.add(cx, cy, cz, radius)
+            failed.append(i)
+
+    return offsets, failed
+
+
+def face_normals(points, offsets, vertex_ids):
+    """
+    :return: Flat xyz unit normal of every face.
+    """
+    normals = array('d')
+    for f in range(len(offsets) - 1):
+        normals.extend(normalize(face_normal(points, offsets, vertex_ids, f)))
+    return normals
+
+
+def edge_angles(points, offsets, vertex_ids, edge_vertices):
+    """
+    The angle between the faces on either side of every edge.
+    :param edge_vertices: Flat (vertex a, vertex b) of every edge, in edge id order.
+    :return: array of angles in degrees, -1 for border and non manifold edges.
+    """
+    normals = face_normals(points, offsets, vertex_ids)
+    edges = face_edges(offsets, vertex_ids, range(len(offsets) - 1))
+
+    angles = array('d')
+    for e in range(len(edge_vertices) // 2):
+        a = edge_vertices[e * 2]
+        b = edge_vertices[e * 2 + 1]
+        faces = edges.get((a, b) if a < b else (b, a))
+        if faces is None or len(faces) != 2:
+            angles.append(-1.0)
+            continue
+        f1 = faces[0] * 3
+        f2 = faces[1] * 3
+        dot = normals[f1] * normals[f2] + normals[f1 + 1] * normals[f2 + 1] + normals[f1 + 2] * normals[f2 + 2]
+        angles.append(math.degrees(math.acos(max(-1.0, min(1.0, dot)))))
+    return angles
+
+
+def uv_seam_edges(offsets, vertex_ids, uv_counts, uv_ids, edge_vertices):
+    """
+    Finds the edges where the faces on either side use different uvs.
+    :param uv_counts: Number of uvs on each face, 0 for faces without uvs.
+    :param uv_ids: The uv of each face vertex, for the faces that have them.
+    :param edge_vertices: Flat (vertex a, vertex b) of every edge, in edge id order.
+    :return: Set of edge ids.
+    """
+    # (low vertex, high vertex): list of the (uv at low, uv at high) of each face on the edge.
+    edge_uvs = {}
+    uv_start = 0
+    for f in range(len(offsets) - 1):
+        start = offsets[f]
+        size = offsets[f + 1] - start
+        if uv_counts[f] != size:
+            uv_start += uv_counts[f]
+            continue
+        for i in range(size):
+            j = (i + 1) % size
+            a = vertex_ids[start + i]
+            b = vertex_ids[start + j]
+            uv_a = uv_ids[uv_start + i]
+            uv_b = uv_ids[uv_start + j]
+            if a < b:
+                edge_uvs.setdefault((a, b), []).append((uv_a, uv_b))
+            else:
+                edge_uvs.setdefault((b, a), []).append((uv_b, uv_a))
+        uv_start += size
+
+    seams = set()
+    for e in range(len(edge_vertices) // 2):
+        a = edge_vertices[e * 2]
+        b = edge_vertices[e * 2 + 1]
+        uvs = edge_uvs.get((a, b) if a < b else (b, a))
+        if uvs and len(uvs) > 1 and any(uv != uvs[0] for uv in uvs[1:]):
+            seams.add(e)
+    return seams
+
+
+def edge_hardness(angles, threshold, seams=()):
+    """
+    Sorts edges into hard and soft, edges sharper than the threshold and seams are hard.
+    Border edges are left out of both.
+    :return: (hard edge ids, soft edge ids)
+    """
+    hard = array('i')
+    soft = array('i')
+    for e, angle in enumerate(angles):
+        if angle < 0:
+            continue
+        if angle > threshold or e in seams:
+            hard.append(e)
+        else:
+            soft.append(e)
+    return hard, soft
+
+
+def normal_deviation(points, offsets, vertex_ids, normals, locked=None):
+    """
+    Measures how far the face vertex normals of a mesh lean away from their faces.
+    :param normals: Flat xyz normal of every face vertex, in the same order as vertex_ids.
+    :param locked: 1 for every face vertex whose normal is locked, all unlocked if None.
+    :return: Dictionary of
+        max_angle, mean_angle - array of degrees per face, -1 for degenerate faces.
+        flipped_faces - face ids with a normal pointing away from the face.
+        degenerate_faces - face ids with no area.
+        flipped, degenerate_normals, locked, unlocked - face vertex counts.
+    """
+    result = {
+        'max_angle': array('f'),
+        'mean_angle': array('f'),
+        'flipped_faces': array('i'),
+        'degenerate_faces': array('i'),
+        'flipped': 0,
+        'degenerate_normals': 0,
+        'locked': 0,
+        'unlocked': 0,
+    }
+
+    for f in range(len(offsets) - 1):
+        start = offsets[f]
+        end = offsets[f + 1]
+
+        if locked is None:
+            result['unlocked'] += end - start
+        else:
+            face_locked = sum(1 for k in range(start, end) if locked[k])
+            result['locked'] += face_locked
+            result['unlocked'] += end - start - face_locked
+
+        fx, fy, fz = normalize(face_normal(points, offsets, vertex_ids, f))
+        if fx == fy == fz == 0:
+            result['degenerate_faces'].append(f)
+            result['max_angle'].append(-1.0)
+            result['mean_angle'].append(-1.0)
+            continue
+
+        largest = total = 0.0
+        counted = 0
+        flipped = False
+        for k in range(start, end):
+            nx, ny, nz = normalize(normals[k * 3:k * 3 + 3])
+            if nx == ny == nz == 0:
+                result['degenerate_normals'] += 1
+                continue
+            dot = fx * nx + fy * ny + fz * nz
+            if dot < 0:
+                result['flipped'] += 1
+                flipped = True
+            angle = math.degrees(math.acos(max(-1.0, min(1.0, dot))))
+            largest = max(largest, angle)
+            total += angle
+            counted += 1
+
+        if flipped:
+            result['flipped_faces'].append(f)
+        result['max_angle'].append(largest)
+        result['mean_angle'].append(total / counted if counted else 0.0)
+
+    return result
+
+
+def serve(stdin, stdout):
+    """
+    Runs jobs sent by sd_mesh_pipeline until stdin is closed.
+    Each job is a pickled (function name, args) and each answer a pickled
+    ('ok', result) or ('error', traceback).
+    """
+    while True:
+        try:
+            name, args = pickle.load(stdin)
+        except EOFError:
+            return
+        try:
+            answer = ('ok', globals()[name](*args))
+        except Exception:
+            answer = ('error', traceback.format_exc())
+        pickle.dump(answer, stdout, pickle.HIGHEST_PROTOCOL)
+        stdout.flush()
+
+
+if __name__ == '__main__':
+    # anything printed would end up in the answers, keep stdout for them only.
+    out = sys.stdout
+    sys.stdout = sys.stderr
+    # served from the imported module, so what it pickles points at sd_compute and not __main__.
+    import sd_compute
+    sd_compute.serve(sys.stdin, out)
@@ -24,9 +24,126 @@ def sd_undo_chunk(func):
     return inner
 
 
+def sd_fast_edit(func):
+    """
+    Runs the function inside a fast_edit with its default settings.
+    """
+    def inner(*args, **kwargs):
+        with fast_edit():
+            return func(*args, **kwargs)
+    return inner
+
+
 class undo_chunk(object):
     def __enter__(self):
         pm.undoInfo(openChunk=True)
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        pm.undoInfo(closeChunk=True)
\ No newline at end of file
+        pm.undoInfo(closeChunk=True)
+
+
+class fast_edit(object):
+    """
+    Context for heavy edits, everything inside it becomes one undo chunk and the
+    viewport stops redrawing until it is done.
+    auto key can also be switched off, and the evaluation manager switched to dg, for the duration.
+    whatever was changed on the way in is put back on the way out, even if the edit fails.
+
+    changing the evaluation manager mode throws away the evaluation graph and switching it back
+    forces a full rebuild, so dg_rebuild_graph only pays off for edits that would invalidate
+    the graph anyway, eg. adding or deleting lots of nodes or connections.
+
+    with fast_edit(disable_auto_key=True):
+        ...
+
+    an instance can also be used as a decorator:
+
+    @fast_edit(dg_rebuild_graph=True)
+    def my_tool():
+        ...
+    """
+    # refresh suspension is shared, only the outer most context suspends and resumes it.
+    _suspend_depth = 0
+
+    def __init__(self, undo=True, suspend_refresh=True, disable_auto_key=False, dg_rebuild_graph=False):
+        self.undo = undo
+        self.suspend_refresh = suspend_refresh
+        self.disable_auto_key = disable_auto_key
+        self.dg_rebuild_graph = dg_rebuild_graph
+
+        self._restore = []
+
+    def __call__(self, func):
+        options = dict(
+            undo=self.undo,
+            suspend_refresh=self.suspend_refresh,
+            disable_auto_key=self.disable_auto_key,
+            dg_rebuild_graph=self.dg_rebuild_graph
+        )
+
+        def inner(*args, **kwargs):
+            with fast_edit(**options):
+                return func(*args, **kwargs)
+        return inner
+
+    def __enter__(self):
+        try:
+            if self.undo:
+                pm.undoInfo(openChunk=True)
+                self._restore.append(lambda: pm.undoInfo(closeChunk=True))
+
+            if self.suspend_refresh:
+                self._suspend()
+
+            if self.disable_auto_key:
+                auto_key = pm.autoKeyframe(query=True, state=True)
+                if auto_key:
+                    pm.autoKeyframe(state=False)
+                    self._restore.append(lambda: pm.autoKeyframe(state=auto_key))
+
+            if self.dg_rebuild_graph:
+                mode = pm.evaluationManager(query=True, mode=True)[0]
+                if mode != 'off':
+                    pm.evaluationManager(mode='off')
+                    self._restore.append(lambda: pm.evaluationManager(mode=mode))
+        except Exception:
+            self._unwind()
+            raise
+
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        error = self._unwind()
+        if error is not None:
+            if exc_type is None:
+                raise error
+            pm.displayWarning('fast_edit could not restore all settings: {}'.format(error))
+        return False
+
+    def _suspend(self):
+        if fast_edit._suspend_depth == 0 and not pm.about(batch=True):
+            pm.refresh(suspend=True)
+        fast_edit._suspend_depth += 1
+        self._restore.append(self._resume)
+
+    @staticmethod
+    def _resume():
+        fast_edit._suspend_depth -= 1
+        if fast_edit._suspend_depth == 0 and not pm.about(batch=True):
+            pm.refresh(suspend=False)
+            pm.refresh()
+
+    def _unwind(self):
+        """
+        puts everything back in the reverse order it was changed.
+        every step is attempted, the first error is returned after they have all run.
+        """
+        error = None
+        while self._restore:
+            step = self._restore.pop()
+            try:
+                step()
+            except Exception as ex:
+                if error is None:
+                    error = ex
+        return error
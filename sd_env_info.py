@@ -0,0 +1,199 @@
+"""
+Environment snapshots for bug and crash reports
+created by: Sean Disero
+
+A snapshot is a plain dictionary that dumps straight to json.
+Facts that can't change while maya is running are only collected once, slow probes
+run on a thread and are given up on after a timeout (and picked up by a later snapshot).
+Module import times are only recorded once install_import_timer is called, it replaces
+__import__ for the whole session so it is left to the user, eg. at the top of userSetup.py.
+
+    import sd_env_info
+    sd_env_info.install_import_timer()
+    ...
+    report = sd_env_info.snapshot_json()
+    drift = sd_env_info.diff(snapshot_a, snapshot_b)
+
+License: MIT
+"""
+
+import __builtin__
+import json
+import os
+import platform
+import sys
+import threading
+import time
+
+import maya.cmds as mc
+
+
+# kept when the module is reloaded, none of this changes while maya is running.
+try:
+    _STATIC_INFO
+except NameError:
+    _STATIC_INFO = {}
+    _PROBES = {}
+    # probe name: thread still running it, so a later snapshot doesn't start another one.
+    _PROBE_THREADS = {}
+    _IMPORT_TIMES = {}
+    _ORIGINAL_IMPORT = __builtin__.__import__
+
+# probes that can be slow, platform.processor() can start a subprocess on linux.
+SLOW_PROBES = {
+    'processor': platform.processor,
+}
+
+
+def _timed_import(name, *args, **kwargs):
+    if name in sys.modules:
+        return _ORIGINAL_IMPORT(name, *args, **kwargs)
+
+    start = time.time()
+    try:
+        return _ORIGINAL_IMPORT(name, *args, **kwargs)
+    finally:
+        # the time includes whatever the module imports itself.
+        _IMPORT_TIMES.setdefault(name, time.time() - start)
+
+
+def install_import_timer():
+    """
+    Starts recording how long each new module takes to import, safe to call more than once.
+    Only modules imported after it is called are timed.
+    """
+    if __builtin__.__import__ is not _timed_import:
+        __builtin__.__import__ = _timed_import
+
+
+def uninstall_import_timer():
+    __builtin__.__import__ = _ORIGINAL_IMPORT
+
+
+def _static_info():
+    if not _STATIC_INFO:
+        _STATIC_INFO.update({
+            'maya': {
+                'version': mc.about(version=True),
+                'qt_version': mc.about(qtVersion=True),
+                'is64': mc.about(is64=True),
+                'batch': mc.about(batch=True),
+                'os': mc.about(os=True),
+            },
+            'python': {
+                'version': sys.version,
+                'executable': sys.executable,
+            },
+            'machine': {
+                'node': platform.node(),
+                'release': platform.release(),
+                'version': platform.version(),
+                'machine': platform.machine(),
+            },
+        })
+    return _STATIC_INFO
+
+
+def _run_probe(name):
+    try:
+        _PROBES[name] = SLOW_PROBES[name]()
+    except Exception as ex:
+        _PROBES[name] = 'error: {}'.format(ex)
+
+
+def _slow_info(timeout):
+    """
+    Runs every probe that hasn't finished yet on its own thread, all at once.
+    Probes that are still running when the timeout is up are left as None,
+    the next snapshot waits on the same thread instead of starting another.
+    """
+    threads = []
+    for name in SLOW_PROBES:
+        if name in _PROBES:
+            continue
+        thread = _PROBE_THREADS.get(name)
+        if thread is None or not thread.is_alive():
+            thread = threading.Thread(target=_run_probe, args=(name,))
+            thread.daemon = True
+            thread.start()
+            _PROBE_THREADS[name] = thread
+        threads.append(thread)
+
+    deadline = time.time() + timeout
+    for thread in threads:
+        thread.join(max(deadline - time.time(), 0))
+
+    return dict((name, _PROBES.get(name)) for name in SLOW_PROBES)
+
+
+def snapshot(timeout=1.0, environment=True, modules=True):
+    """
+    Takes a snapshot of the scene, maya, python, machine and environment.
+    :param timeout: Seconds to wait for the slow probes.
+    :param environment: Include environment variables and sys.path.
+    :param modules: Include loaded modules with their files, and import_seconds with their import times.
+    :return: Dictionary that can be dumped to json.
+    """
+    static = _static_info()
+    info = {
+        'time': time.time(),
+        'scene': {'name': mc.file(query=True, sceneName=True)},
+        'maya': dict(static['maya']),
+        'python': dict(static['python']),
+        'machine': dict(static['machine']),
+    }
+    info['machine'].update(_slow_info(timeout))
+
+    if environment:
+        info['environment'] = dict(os.environ)
+        info['sys_path'] = list(sys.path)
+
+    if modules:
+        loaded = [(name, module) for name, module in sys.modules.items() if module is not None]
+        info['modules'] = dict((name, getattr(module, '__file__', None)) for name, module in loaded)
+        # timings differ on every run, they are kept apart so diff can leave them out.
+        info['import_seconds'] = dict(
+            (name, _IMPORT_TIMES[name]) for name, module in loaded if name in _IMPORT_TIMES
+        )
+
+    return info
+
+
+def snapshot_json(indent=None, **kwargs):
+    """
+    :return: The snapshot as a json string, see snapshot for the arguments.
+    """
+    return json.dumps(snapshot(**kwargs), indent=indent, sort_keys=True, default=str)
+
+
+def _flatten(data, prefix='', out=None):
+    if out is None:
+        out = {}
+    for key, value in data.items():
+        path = prefix + '/' + key if prefix else key
+        if isinstance(value, dict):
+            _flatten(value, path, out)
+        else:
+            out[path] = value
+    return out
+
+
+def diff(a, b, ignore=('time', 'import_seconds')):
+    """
+    Compares two snapshots, eg. from two render nodes.
+    Nested keys are joined with '/', like 'environment/PATH'.
+    :param ignore: Top level keys to leave out, by default the ones that change on every run.
+    :return: Dictionary of added, removed and changed keys, changed values are [a, b].
+    """
+    flat_a = _flatten(dict((k, v) for k, v in a.items() if k not in ignore))
+    flat_b = _flatten(dict((k, v) for k, v in b.items() if k not in ignore))
+
+    keys_a = set(flat_a)
+    keys_b = set(flat_b)
+    return {
+        'added': dict((k, flat_b[k]) for k in keys_b - keys_a),
+        'removed': dict((k, flat_a[k]) for k in keys_a - keys_b),
+        'changed': dict(
+            (k, [flat_a[k], flat_b[k]]) for k in keys_a & keys_b if flat_a[k] != flat_b[k]
+        ),
+    }
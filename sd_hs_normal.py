@@ -9,31 +9,160 @@ if a face has no edges running through it then it will need to be selected manua
 if a bevel is perfectly flat and has an edge running through it, turning it into two triangles,
     that edge should be deleted, else it could constrain the vtx normals of that edge to the bevel.
 
-if the window is reloaded it will loose its connection to the blinn mtl if one was created.
+the preview blinn is tagged, so it is found again and reused after the window is reloaded.
+
+the tool is kept alive between uses, closing the window only hides it and reopening it
+(or reloading the module) keeps the cached mesh data warm. use sd_hs_normal.show() to reopen it.
 
 progress bars will likely be switched to the gMainProgressBar in the future in order to cancel operations.
 
 installation:
 
-drag HS_Normal_Adj.py into the scripts folder C:\Users\userName\Documents\maya\mayaYear(ex.maya2017)\scripts
+drag sd_hs_normal.py into the scripts folder C:\Users\userName\Documents\maya\mayaYear(ex.maya2017)\scripts
 
 in maya create this Python script and place it on your shelf:
 
-import HS_Normal_Adj
-reload(HS_Normal_Adj)
+import sd_hs_normal
+sd_hs_normal.show()
+
+reload(sd_hs_normal) is only needed to pick up changes to the code, the tool and its window survive it.
 
 License: MIT
 """
 
+import json
+import time
+
 import pymel.all as pm
+import maya.cmds as mc
 import maya.mel as mm
+import maya.api.OpenMaya as om2
 import sd_decorators as sdd
+import sd_journal as sdj
+import sd_mesh_io as sdio
+import sd_mesh_pipeline as sdmp
+
+
+class SDPreviewShader(object):
+    """
+    Manages the blinn used for previewing normals.
+    The shader is tagged with an attribute so it is found and reused instead of duplicated,
+    and the original shading assignments are stored on its shading group so they can be
+    restored even after the tool has been reloaded.
+    """
+    TAG_ATTR = 'sdHsPreview'
+    ASSIGNMENTS_ATTR = 'sdOriginalAssignments'
+
+    def find(self):
+        """
+        :return: (shader, shading group) of the tagged preview blinn, (None, None) if there isn't one.
+        """
+        for shader in mc.ls(type='blinn') or []:
+            if mc.attributeQuery(self.TAG_ATTR, node=shader, exists=True):
+                groups = mc.listConnections(shader + '.outColor', type='shadingEngine') or []
+                if groups:
+                    return shader, groups[0]
+        return None, None
+
+    def get_or_create(self):
+        shader, shading_group = self.find()
+        if shader:
+            return shader, shading_group
+
+        shader = mc.shadingNode('blinn', asShader=True, name='sd_hs_preview_blinn')
+        mc.addAttr(shader, longName=self.TAG_ATTR, attributeType='bool', defaultValue=True)
+
+        shading_group = mc.sets(renderable=True, noSurfaceShader=True, empty=True, name='sd_hs_preview_SG')
+        mc.addAttr(shading_group, longName=self.ASSIGNMENTS_ATTR, dataType='string')
+        mc.setAttr(shading_group + '.' + self.ASSIGNMENTS_ATTR, '{}', type='string')
+        mc.connectAttr(shader + '.outColor', shading_group + '.surfaceShader')
+
+        return shader, shading_group
+
+    def get_assignments(self, shading_group):
+        return json.loads(mc.getAttr(shading_group + '.' + self.ASSIGNMENTS_ATTR) or '{}')
+
+    def set_assignments(self, shading_group, assignments):
+        mc.setAttr(shading_group + '.' + self.ASSIGNMENTS_ATTR, json.dumps(assignments), type='string')
+
+    def assign(self, shapes):
+        """
+        assigns the preview shader to all the shapes with one set membership edit,
+        remembering what they had assigned before.
+        :param shapes: long names of mesh shapes.
+        :return: the preview shader.
+        """
+        shader, shading_group = self.get_or_create()
+        if not shapes:
+            return shader
+
+        shapes = mc.ls(list(shapes), long=True)
+        parents = mc.listRelatives(shapes, parent=True, fullPath=True) or []
+        # sets lists its members by their shortest unique names (per face ones by the transform),
+        # the shapes are compared in that form.
+        target_names = set(mc.ls(shapes + parents))
+
+        assignments = self.get_assignments(shading_group)
+        # nodes with members in a shading group the shapes are connected to, the preview one included.
+        covered = set()
+        for group in set(mc.listConnections(shapes, type='shadingEngine') or []):
+            members = mc.sets(group, query=True) or []
+            names = set(member.split('.')[0] for member in members)
+            covered.update(names)
+            if group == shading_group or not names & target_names:
+                continue
+            owned = [member for member in members if member.split('.')[0] in target_names]
+            assignments[group] = sorted(set(assignments.get(group, [])).union(owned))
+
+        # shapes that weren't in any shading group are put back on the default one.
+        covered = set(mc.ls(list(covered), long=True)) if covered else set()
+        unassigned = [s for s in shapes if s not in covered and s.rsplit('|', 1)[0] not in covered]
+        if unassigned:
+            group = 'initialShadingGroup'
+            assignments[group] = sorted(set(assignments.get(group, [])).union(mc.ls(unassigned)))
+        self.set_assignments(shading_group, assignments)
+
+        mc.sets(shapes, edit=True, forceElement=shading_group)
+        return shader
+
+    def restore(self):
+        """
+        puts back the shading assignments from before the preview, one set edit per shading group.
+        """
+        shader, shading_group = self.find()
+        if not shader:
+            return
+
+        assignments = self.get_assignments(shading_group)
+        for group, members in assignments.items():
+            members = mc.ls(members)
+            if mc.objExists(group) and members:
+                mc.sets(members, edit=True, forceElement=group)
+        self.set_assignments(shading_group, {})
 
 
 class HS_Normal:
 
+    # seconds between slider drag updates of the vtx normal length.
+    DRAG_INTERVAL = 1.0 / 30
+
     def __init__(self):
-        self.normal_shader = None
+        self.preview = SDPreviewShader()
+        self.normal_shader = self.preview.find()[0]
+        self.blinn_tex_warning = False
+
+        # mesh shapes the vtx normal display controls work on, resolved once per selection.
+        self.display_shapes = None
+        self.last_drag_time = 0
+
+        self.ui_built = False
+
+    def scene_changed(self, *args):
+        """
+        drops everything that belonged to the previous scene.
+        """
+        self.display_shapes = None
+        self.normal_shader = self.preview.find()[0]
         self.blinn_tex_warning = False
 
     def test_type(self, selection, target_type):
@@ -45,16 +174,23 @@ class HS_Normal:
             else:
                 raise TypeError('you must only select faces for this function to work')
 
+    @sdd.sd_fast_edit
     @sdd.sd_preserve_selection
-    def connected_flat(self, obj_select=True, min_tolerance=0, max_tolerance=0):
+    @sdj.recorded('HS_Normal.connected_flat', replay=lambda **kw: get_tool().connected_flat(**kw))
+    def connected_flat(self, obj_select=True, min_tolerance=0, max_tolerance=0, regions=False, chunk_size=None):
         """
         if obj_select = True, hard surfaces (perfectly flat) will automatically be
         found and corrected, but only if model properly finished.
         min_tolerance = the minimum angle that will be selected.
         max_tolerance = the maximum angle that will be selected.
+        if regions = True, connected faces within the tolerance are clustered into
+        regions and each region gets one area weighted normal.
+        chunk_size = for huge meshes, the most faces worked on at once. the result is the same,
+        only the memory used changes. regions need the whole mesh at once and ignore it.
         """
 
-        self.test_type(pm.ls(sl=True, flatten=True))
+        # face ranges are kept as ranges, flattening huge selections into PyNodes is slow.
+        self.test_type(pm.ls(sl=True), [pm.MeshFace, pm.Transform])
 
         if obj_select:
             # convert selection to edges
@@ -69,7 +205,7 @@ class HS_Normal:
             )
 
             # save the selection
-            oSel = pm.ls(sl=True, flatten=True)
+            oSel = pm.ls(sl=True)
 
             # turn off polySelectConstraint
             pm.polySelectConstraint(mode=0)
@@ -80,121 +216,144 @@ class HS_Normal:
             # convert to faces
             mm.eval('ConvertSelectionToFaces;')
 
-        fSel = pm.ls(sl=True, flatten=True)
-
-        # create a good ol' progress bar
-        progWind = pm.window(title='progress')
-        pm.columnLayout()
-
-        progressControl = pm.progressBar(maxValue=len(fSel), width=300)
-
-        pm.showWindow(progWind)
-
-        # run through each object and get the face normal of each face
-        # apply the face normal direction to the connected verts
-        for face in fSel:
-            pm.select(face)
-            face_normal = face.getNormal(space='world')
-            verts = pm.polyListComponentConversion(
-                face,
-                fromFace=True,
-                toVertex=True
-            )
-
-            pm.select(verts)
-            pm.polyNormalPerVertex(normalXYZ=face_normal)
-
-            ff = fSel.index(face)
-            pm.progressBar(progressControl, edit=True, progress=ff)
-
-        pm.deleteUI(progWind)
-
-    def hs_verts(self, f1, f2):
+        # streamed one chunk of faces at a time, each chunk is written before the next is read.
+        if chunk_size and not regions:
+            for dag, chunks in sdio.stream_components(chunk_size=chunk_size):
+                for edit in sdio.flat_surface_edits(dag, chunks):
+                    sdio.apply_edits([edit])
+            return
+
+        # get the face normal of each face (or region) and apply it to the connected verts,
+        # with several meshes selected they are worked out in parallel and written as they finish.
+        mode = 'regions' if regions else 'flat'
+        sdmp.apply_normals(sdio.components_by_mesh(), mode, min_tolerance, max_tolerance)
+
+    @sdd.sd_fast_edit
+    @sdj.recorded('HS_Normal.harden_edges', replay=lambda **kw: get_tool().harden_edges(**kw))
+    def harden_edges(self, threshold=30.0, uv_seams=False):
         """
-        this function finds the average of the face normals on each side of
-        an edge then adjusts the vtx normals to that average
+        sets edges sharper than the threshold angle hard and everything else soft,
+        run it before the flat and curved surface tools.
+        works on the selected edges, or every edge of selected objects.
+        uv_seams = True will also harden the uv seam edges.
         """
-        average_n = (f1.getNormal(space='world') + f2.getNormal(space='world')) / (2, 2, 2)
-
-        verts1 = pm.polyListComponentConversion(
-            f1,
-            fromFace=True,
-            toVertex=True
-        )
-
-        pm.select(verts1)
-        v1 = pm.ls(sl=True, flatten=True)
-
-        verts2 = pm.polyListComponentConversion(
-            f2,
-            fromFace=True,
-            toVertex=True
-        )
-
-        pm.select(verts2)
-        v2 = pm.ls(sl=True, flatten=True)
-
-        sVerts = [i for i in v1 if i in v2]
-
-        pm.select(sVerts)
+        # meshes without history are set straight through the api, so they don't get any.
+        edits = [
+            sdio.edge_hardness_edit(dag, edges, threshold, uv_seams)
+            for dag, edges in sdio.components_by_mesh(component_type=om2.MFn.kMeshEdgeComponent)
+        ]
+        sdio.apply_edits(edits)
+        hardened = sum(edit.count(False) for edit in edits)
+        softened = sum(edit.count(True) for edit in edits)
+        print 'hardened {} edges, softened {} edges'.format(hardened, softened)
+
+    @sdd.sd_fast_edit
+    @sdj.recorded('HS_Normal.transfer_normals', replay=lambda **kw: get_tool().transfer_normals(**kw))
+    def transfer_normals(self, max_distance=None, min_dot=0.5):
+        """
+        copies the locked vtx normals of the first selected mesh onto every other selected mesh,
+        for moving tuned normals onto LODs or new revisions of the same asset.
+        max_distance = furthest apart (in world space) a match can be, worked out from the source if None.
+        min_dot = how closely the faces have to point the same way for a match.
+        """
+        oSel = pm.ls(sl=True, objectsOnly=True)
+        if len(oSel) < 2:
+            raise RuntimeError('select the source mesh and then the meshes to transfer to')
 
-        pm.polyNormalPerVertex(normalXYZ=average_n)
+        # each target is matched by a worker and written as soon as it is done.
+        sdmp.apply_transfer(oSel[0], oSel[1:], max_distance, min_dot)
 
-    def hs_tube(self, edgering=True):
+    @sdd.sd_fast_edit
+    @sdj.recorded('HS_Normal.hs_tube', replay=lambda **kw: get_tool().hs_tube(**kw))
+    def hs_tube(self, edgering=True, chunk_size=None):
         """
         used for correcting normals on the ends of a hard surface pipe.
         if edgering = True, than only one edge need be selected and it will select
         the ring automatically.
+        chunk_size = for huge selections, the most edges worked on at once. the result is the same,
+        only the memory used changes.
         """
         if edgering:
             mm.eval('SelectEdgeRingSp;')
 
-        oSel = pm.ls(sl=True, flatten=True)
-
-        for obj in oSel:
-
-            # determine weather or not the selection is a face
-            if str(obj.split('.')[-1][0]) == 'f':
-                # if it is, convert it to edges
-                mm.eval('ConvertSelectionToContainedEdges;')
-                break
-
-        eSel = pm.ls(sl=True, flatten=True)
-
-        # another good ol' progress bar
-        progWind = pm.window(title='progress')
-        pm.columnLayout()
-
-        progressControl = pm.progressBar(maxValue=len(eSel), width=300)
-
-        pm.showWindow(progWind)
-
-        # for the selected edges run the hs_verts function
-        for edges in eSel:
-            pm.select(edges)
-            mm.eval('ConvertSelectionToFaces;')
-            angled_faces = pm.ls(sl=True, flatten=True)
-            self.hs_verts(angled_faces[0], angled_faces[1])
-
-            ee = eSel.index(edges)
-            pm.progressBar(progressControl, edit=True, progress=ee)
-
-        pm.deleteUI(progWind)
+        # determine weather or not the selection has faces, ranges are kept as ranges.
+        if mc.filterExpand(selectionMask=34, expand=False):
+            # if it does, convert it to edges
+            mm.eval('ConvertSelectionToContainedEdges;')
+
+        # streamed one chunk of edges at a time, each chunk is written before the next is read.
+        if chunk_size:
+            for dag, chunks in sdio.stream_components(component_type=om2.MFn.kMeshEdgeComponent, chunk_size=chunk_size):
+                for edges in chunks:
+                    sdio.apply_edits([sdio.edge_average_edit(dag, edges)])
+            pm.selectType(edge=True)
+            return
+
+        # average the faces on either side of every selected edge and
+        # write all the meshes back in one undoable edit.
+        edits = [
+            sdio.edge_average_edit(dag, edges)
+            for dag, edges in sdio.components_by_mesh(component_type=om2.MFn.kMeshEdgeComponent)
+        ]
+        sdio.apply_edits(edits)
 
         pm.selectType(edge=True)
 
+    def get_display_shapes(self):
+        """
+        the mesh shapes under the selection, cached until the selection changes.
+        """
+        if self.display_shapes is None:
+            self.display_shapes = []
+            objects = pm.ls(sl=True, objectsOnly=True)
+            if objects:
+                for shape in pm.ls(objects, dag=True, type='mesh', noIntermediate=True, long=True):
+                    self.display_shapes.append(om2.MFnDependencyNode(sdio.get_dag_path(shape).node()))
+        return self.display_shapes
+
+    def clear_display_shapes(self, *args):
+        self.display_shapes = None
+
+    def set_display_attrs(self, values):
+        """
+        sets display attributes on every display shape in one go,
+        shapes that already have the value are skipped.
+        display settings don't go into the undo queue.
+        :param values: list of (attribute name, value)
+        """
+        modifier = om2.MDGModifier()
+        changed = False
+        for node in self.get_display_shapes():
+            for attr, value in values:
+                plug = node.findPlug(attr, False)
+                if isinstance(value, float):
+                    if abs(plug.asFloat() - value) > 1e-6:
+                        modifier.newPlugValueFloat(plug, value)
+                        changed = True
+                elif plug.asInt() != value:
+                    modifier.newPlugValueInt(plug, value)
+                    changed = True
+        if changed:
+            modifier.doIt()
+
     def vtx_normal_length(self, *args):
-        oSel = pm.ls(sl=True, flatten=True)
+        # drag updates are throttled, the change command sets the final value.
+        now = time.time()
+        if now - self.last_drag_time < self.DRAG_INTERVAL:
+            return
+        self.last_drag_time = now
+        self.set_vtx_normal_length()
+
+    def set_vtx_normal_length(self, *args):
         length = pm.floatSliderGrp(self.float3, q=True, value=True)
-        for objs in oSel:
-            name = objs.name()
-            pm.setAttr('%s.normalSize' % name, length)
+        self.set_display_attrs([('normalSize', float(length))])
 
     def btn_connected_flat(self, *args):
         objSel = pm.checkBox(self.objCheck, q=True, value=True)
         minTol = pm.floatSliderGrp(self.float1, q=True, value=True)
         maxTol = pm.floatSliderGrp(self.float2, q=True, value=True)
-        self.connected_flat(objSel, minTol, maxTol)
+        regions = pm.checkBox(self.regionCheck, q=True, value=True)
+        self.connected_flat(objSel, minTol, maxTol, regions)
 
     @sdd.sd_preserve_selection
     def btn_hs_tube(self, *args):
@@ -202,24 +361,41 @@ class HS_Normal:
         print edgeCheck
         self.hs_tube(edgeCheck)
 
+    @sdd.sd_fast_edit
     def create_blinn(self):
         """
-        creates a blinn for observing how light interacts with the surface of an object
+        creates a blinn for observing how light interacts with the surface of an object,
+        if there is already one in the scene it is reused.
         """
-        oSel = pm.ls(sl=True)
+        objects = mc.ls(sl=True, objectsOnly=True)
+        shapes = mc.ls(objects, dag=True, type='mesh', noIntermediate=True, long=True) if objects else []
+
+        self.normal_shader = self.preview.assign(shapes)
 
-        self.normal_shader = pm.shadingNode('blinn', asShader=True)
-        self.normal_shading_group = pm.sets(renderable=True, noSurfaceShader=True, empty=True)
-        pm.connectAttr('%s.outColor' % self.normal_shader, '%s.surfaceShader' % self.normal_shading_group)
-        for objs in oSel:
-            pm.select(objs)
-            pm.hyperShade(assign='%s' % self.normal_shader)
-        pm.select(oSel)
+    @sdd.sd_fast_edit
+    def restore_shaders(self):
+        """
+        puts back the shaders the objects had before the blinn was assigned.
+        """
+        self.preview.restore()
+
+    def btn_harden_edges(self, *args):
+        threshold = pm.floatSliderGrp(self.hardAngle, q=True, value=True)
+        uv_seams = pm.checkBox(self.seamCheck, q=True, value=True)
+        self.harden_edges(threshold, uv_seams)
+
+    def btn_transfer_normals(self, *args):
+        self.transfer_normals()
 
     def btn_create_blinn(self, *args):
         self.create_blinn()
 
+    def btn_restore_shaders(self, *args):
+        self.restore_shaders()
+
     def edit_blinn(self, *args):
+        if self.normal_shader and not pm.objExists(self.normal_shader):
+            self.normal_shader = self.preview.find()[0]
         if not self.normal_shader:
             if not self.blinn_tex_warning:
                 pm.displayWarning('you havent made a blinn yet you potato!')
@@ -229,22 +405,42 @@ class HS_Normal:
             pm.setAttr('%s.color' % self.normal_shader, newColour, type='double3')
 
     def btn_show_vtx_normals(self, *args):
-        oSel = pm.ls(sl=True, flatten=True)
-        for objs in oSel:
-            name = objs.name()
-            pm.setAttr('%s.normalType' % name, 2)
-            pm.setAttr('%s.displayNormal' % name, 1)
+        self.set_display_attrs([('normalType', 2), ('displayNormal', 1)])
 
     def btn_hide_vts_normals(self, *args):
-        oSel = pm.ls(sl=True, flatten=True)
-        for objs in oSel:
-            name = objs.name()
-            pm.setAttr('%s.normalType' % name, 2)
-            pm.setAttr('%s.displayNormal' % name, 0)
+        self.set_display_attrs([('normalType', 2), ('displayNormal', 0)])
 
+    @sdd.sd_fast_edit
     def unlockVtxN(self, *args):
         pm.polyNormalPerVertex(ufn=True)
 
+    def ui_command(self, name):
+        """
+        a ui callback that looks the method up when it runs,
+        so the window keeps working with the new code after the module is reloaded.
+        """
+        def command(*args):
+            return getattr(self, name)(*args)
+        return command
+
+    def register_script_jobs(self):
+        """
+        (re)makes the script jobs of the window, killing the ones made before.
+        """
+        for job in getattr(self, 'script_jobs', []):
+            if pm.scriptJob(exists=job):
+                pm.scriptJob(kill=job, force=True)
+
+        testWindow = 'HS_Normal_Tool'
+        self.script_jobs = [
+            # the display controls cache the shapes they work on until the selection changes.
+            pm.scriptJob(event=('SelectionChanged', self.clear_display_shapes), parent=testWindow),
+            # anything cached about the old scene is dropped when another is opened.
+            pm.scriptJob(event=('SceneOpened', self.scene_changed), parent=testWindow),
+            pm.scriptJob(event=('NewSceneOpened', self.scene_changed), parent=testWindow),
+        ]
+        self.clear_display_shapes()
+
     def showUI(self):
         """
         this is teh function that creates the ui:
@@ -252,10 +448,14 @@ class HS_Normal:
         """
         testWindow = 'HS_Normal_Tool'
 
+        # the window is only hidden when closed, if this instance built it just show it again.
         if pm.window(testWindow, exists=True):
+            if self.ui_built:
+                pm.showWindow(testWindow)
+                return
             pm.deleteUI(testWindow)
 
-        pm.window(testWindow, sizeable=False)
+        pm.window(testWindow, sizeable=False, retain=True)
 
         pm.rowColumnLayout(
             'normal_Column',
@@ -265,16 +465,51 @@ class HS_Normal:
         )
 
         pm.rowLayout(
-            'flatRow',
+            'hardRow',
             parent='normal_Column',
             numberOfColumns=2
         )
 
+        pm.button(
+            label='Harden by Angle',
+            parent='hardRow',
+            width=100,
+            command=self.ui_command('btn_harden_edges')
+        )
+
+        self.seamCheck = pm.checkBox(
+            label='UV Seams',
+            parent='hardRow',
+            value=False
+        )
+
+        self.hardAngle = pm.floatSliderGrp(
+            label='hard_angle',
+            parent='normal_Column',
+            columnAlign=(1, 'left'),
+            columnWidth=(1, 80),
+            field=True,
+            minValue=0,
+            maxValue=180,
+            value=30
+        )
+
+        pm.separator(
+            parent='normal_Column',
+            height=20
+        )
+
+        pm.rowLayout(
+            'flatRow',
+            parent='normal_Column',
+            numberOfColumns=3
+        )
+
         pm.button(
             label='Flat Surface',
             parent='flatRow',
             width=100,
-            command=self.btn_connected_flat
+            command=self.ui_command('btn_connected_flat')
         )
 
         self.objCheck = pm.checkBox(
@@ -283,6 +518,12 @@ class HS_Normal:
             value=True
         )
 
+        self.regionCheck = pm.checkBox(
+            label='Regions',
+            parent='flatRow',
+            value=False
+        )
+
         self.float1 = pm.floatSliderGrp(
             label='min_tolerance',
             parent='normal_Column',
@@ -313,7 +554,7 @@ class HS_Normal:
             label='Curved Surface',
             parent='curveRow',
             width=100,
-            command=self.btn_hs_tube
+            command=self.ui_command('btn_hs_tube')
         )
 
         self.tubeCheck = pm.checkBox(
@@ -330,7 +571,13 @@ class HS_Normal:
         pm.button(
             label='Unlock Selected vtx Normals',
             parent='normal_Column',
-            command=self.unlockVtxN
+            command=self.ui_command('unlockVtxN')
+        )
+
+        pm.button(
+            label='Transfer Locked Normals',
+            parent='normal_Column',
+            command=self.ui_command('btn_transfer_normals')
         )
 
         pm.separator(
@@ -341,8 +588,8 @@ class HS_Normal:
         pm.checkBox(
             label='Toggle vtx Normals',
             parent='normal_Column',
-            onCommand=self.btn_show_vtx_normals,
-            offCommand=self.btn_hide_vts_normals
+            onCommand=self.ui_command('btn_show_vtx_normals'),
+            offCommand=self.ui_command('btn_hide_vts_normals')
         )
 
         self.float3 = pm.floatSliderGrp(
@@ -350,7 +597,8 @@ class HS_Normal:
             parent='normal_Column',
             columnWidth=(1, 55),
             field=True,
-            dragCommand=self.vtx_normal_length,
+            dragCommand=self.ui_command('vtx_normal_length'),
+            changeCommand=self.ui_command('set_vtx_normal_length'),
         )
 
         pm.floatSliderGrp(
@@ -376,7 +624,7 @@ class HS_Normal:
             label='Create Blinn',
             parent='blinnRow',
             width=100,
-            command=self.btn_create_blinn
+            command=self.ui_command('btn_create_blinn')
         )
 
         self.blinnCol = pm.colorSliderGrp(
@@ -384,17 +632,55 @@ class HS_Normal:
             parent='blinnRow',
             width=190,
             columnWidth=(1, 1),
-            dragCommand=self.edit_blinn
+            dragCommand=self.ui_command('edit_blinn')
+        )
+
+        pm.button(
+            label='Restore Shaders',
+            parent='normal_Column',
+            command=self.ui_command('btn_restore_shaders')
         )
 
+        self.ui_built = True
+        self.register_script_jobs()
+
         pm.showWindow(testWindow)
 
         pm.window(
             testWindow,
             edit=True,
-            widthHeight=(300,265)
+            widthHeight=(300,370)
         )
 
 
-tempObj = HS_Normal()
-tempObj.showUI()
\ No newline at end of file
+# the tool outlives its window and reloads of this module, so its caches stay warm.
+try:
+    _TOOL
+except NameError:
+    _TOOL = None
+
+
+def get_tool():
+    """
+    the single HS_Normal instance, made the first time it is asked for.
+    after a reload the same instance is moved over to the new class, so it keeps its
+    caches and window and only its script jobs are made again to run the new code.
+    """
+    global _TOOL
+    if _TOOL is None:
+        _TOOL = HS_Normal()
+        # the undo plugin is loaded up front so the first click doesn't wait for it.
+        sdio.load_undo_plugin()
+    elif _TOOL.__class__ is not HS_Normal:
+        _TOOL.__class__ = HS_Normal
+        if _TOOL.ui_built and pm.window('HS_Normal_Tool', exists=True):
+            _TOOL.register_script_jobs()
+    return _TOOL
+
+
+def show():
+    get_tool().showUI()
+
+
+if not pm.about(batch=True):
+    show()
\ No newline at end of file
@@ -0,0 +1,333 @@
+"""
+Operation journal for the sd tools
+created by: Sean Disero
+
+Once recording is switched on, the tools that change meshes record each run into a journal:
+the tool, its settings, the seed it used and what was selected, with components stored as
+id ranges against a fingerprint of the mesh topology. When an asset is revised the journal
+is replayed onto the new version in one go, instead of running every step again by hand.
+
+Steps whose meshes are missing are reported and skipped, and so are component steps on
+meshes whose topology has changed, their ids would point at different faces so they are
+never applied blindly. Steps on whole objects are replayed onto the revised mesh.
+
+    import sd_journal
+    sd_journal.JOURNAL.recording = True
+    ...
+    sd_journal.JOURNAL.save('C:/journals/crate.json')
+    ...
+    report = sd_journal.replay(sd_journal.SDJournal.load('C:/journals/crate.json'))
+
+nodes can be renamed on replay with mapping={'|crate_v1': '|crate_v2'}, which also moves
+everything under |crate_v1 (its shapes and child meshes) over to the same place under |crate_v2.
+
+License: MIT
+"""
+
+import json
+import time
+import random
+import inspect
+from array import array
+
+import maya.cmds as mc
+import maya.api.OpenMaya as om2
+
+import sd_decorators as sdd
+import sd_mesh_io as sdio
+
+
+COMPONENT_NAMES = {
+    om2.MFn.kMeshVertComponent: 'vtx',
+    om2.MFn.kMeshEdgeComponent: 'e',
+    om2.MFn.kMeshPolygonComponent: 'f',
+    om2.MFn.kMeshMapComponent: 'map',
+}
+
+
+def _ranges(ids):
+    """
+    Collapses component ids into ranges without keeping a list of them.
+    :param ids: Component ids, sorted unless they are few.
+    :return: array of flat first, last pairs.
+    """
+    ids = array('i', ids)
+    if any(ids[i] >= ids[i + 1] for i in xrange(len(ids) - 1)):
+        ids = array('i', sorted(set(ids)))
+
+    ranges = array('i')
+    for i in ids:
+        if ranges and i == ranges[-1] + 1:
+            ranges[-1] = i
+        else:
+            ranges.extend((i, i))
+    return ranges
+
+
+def _mesh_fingerprint(dag):
+    """
+    :return: Topology fingerprint of the mesh under dag, None if it isn't a mesh.
+    """
+    dag = om2.MDagPath(dag)
+    if dag.apiType() == om2.MFn.kTransform:
+        try:
+            dag.extendToShape()
+        except RuntimeError:
+            return None
+    if not dag.hasFn(om2.MFn.kMesh):
+        return None
+    return sdio.topology_fingerprint(om2.MFnMesh(dag))
+
+
+def selection_targets():
+    """
+    Describes the active selection so it can be selected again later.
+    :return: List of dictionaries of
+        node - full path of the node.
+        component - 'vtx', 'e', 'f', 'map' or None for the whole node.
+        ids - flat first, last pairs of the component id ranges.
+        topology - topology fingerprint of the mesh for components, None for whole nodes.
+    """
+    sel = om2.MGlobal.getActiveSelectionList()
+    targets = []
+    for i in range(sel.length()):
+        try:
+            dag, comp = sel.getComponent(i)
+        except (RuntimeError, TypeError):
+            continue
+
+        target = {
+            'node': dag.fullPathName(),
+            'component': None,
+            'ids': array('i'),
+            'topology': None,
+        }
+        # whole nodes are found again by name, only component ids depend on the topology.
+        if not comp.isNull():
+            if comp.apiType() not in COMPONENT_NAMES:
+                continue
+            target['component'] = COMPONENT_NAMES[comp.apiType()]
+            target['ids'] = _ranges(om2.MFnSingleIndexedComponent(comp).getElements())
+            target['topology'] = _mesh_fingerprint(dag)
+        targets.append(target)
+    return targets
+
+
+class SDJournal(object):
+    """
+    The steps recorded from the tools, in the order they were run.
+    Each step is a dictionary of op, params and targets, see selection_targets.
+    Nothing is recorded until recording is set to True.
+    """
+
+    def __init__(self, steps=None):
+        self.steps = list(steps or [])
+        self.recording = False
+
+    def __len__(self):
+        return len(self.steps)
+
+    def record(self, op, params, targets):
+        self.steps.append({
+            'op': op,
+            'params': params,
+            'targets': targets,
+            'time': time.time(),
+        })
+
+    def clear(self):
+        del self.steps[:]
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump({'steps': self.steps}, f, indent=1, sort_keys=True, default=lambda ids: ids.tolist())
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls(json.load(f)['steps'])
+
+
+# kept when the module is reloaded so the steps recorded so far aren't lost.
+try:
+    JOURNAL
+except NameError:
+    JOURNAL = SDJournal()
+    # op name: callable that runs the op on the current selection with the recorded params.
+    OPERATIONS = {}
+    # tools call each other, only the outer most call is a step.
+    _DEPTH = [0]
+
+
+def is_recording():
+    """
+    :return: True if a tool run now would be recorded as a step.
+    """
+    return JOURNAL.recording and not _DEPTH[0]
+
+
+def recorded(op, replay=None):
+    """
+    Records every successful call of the decorated tool into JOURNAL while it is recording.
+    A tool that takes a seed is always given one, so replaying it gives the same result.
+    Put it closest to the function so the other decorators don't hide its arguments.
+    :param op: Name of the step in the journal.
+    :param replay: Callable taking the params as keywords that runs the tool again,
+        the function itself if None. Methods need one, eg. lambda **kw: get_tool().hs_tube(**kw)
+    """
+    def decorator(func):
+        arg_names = inspect.getargspec(func).args
+        # self, or the class, is not a setting of the tool.
+        skip = 1 if arg_names and arg_names[0] in ('self', 'cls') else 0
+
+        def inner(*args, **kwargs):
+            if not is_recording():
+                _DEPTH[0] += 1
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    _DEPTH[0] -= 1
+
+            params = dict(zip(arg_names[skip:], args[skip:]))
+            params.update(kwargs)
+            if 'seed' in arg_names and params.get('seed') is None:
+                params['seed'] = random.randrange(1 << 30)
+
+            targets = selection_targets()
+            _DEPTH[0] += 1
+            try:
+                result = func(*args[:skip], **params)
+            finally:
+                _DEPTH[0] -= 1
+
+            JOURNAL.record(op, params, targets)
+            return result
+
+        OPERATIONS[op] = replay or func
+        inner.__name__ = func.__name__
+        inner.__doc__ = func.__doc__
+        return inner
+    return decorator
+
+
+def record(op, params, targets=None):
+    """
+    Records a step for a tool that is run some other way than its recorded function,
+    eg. a ui that applies it in chunks. The op must already be registered by recorded.
+    :param targets: What the step worked on, see selection_targets. The active selection if None.
+    """
+    if is_recording():
+        JOURNAL.record(op, params, selection_targets() if targets is None else targets)
+
+
+def _map_path(path, mapping):
+    """
+    Renames a recorded path by the longest mapped path it is, or is under.
+    eg. with {'|crate_v1': '|crate_v2'} '|crate_v1|lid|lidShape' becomes '|crate_v2|lid|lidShape'.
+    """
+    for old in sorted(mapping, key=len, reverse=True):
+        if path == old or path.startswith(old + '|'):
+            return mapping[old] + path[len(old):]
+    return path
+
+
+def _resolve(target, mapping):
+    """
+    Finds a target in the current scene.
+    :return: (component names to select, reason it doesn't match or None)
+    """
+    node = _map_path(target['node'], mapping)
+    # components are recorded against the shape, a renamed asset usually renames its shape too,
+    # so the shape is also looked for through its transform.
+    candidates = [node]
+    if target['component'] is not None and node != target['node'] and node.count('|') > 1:
+        candidates.append(node.rsplit('|', 1)[0])
+
+    dag = None
+    for candidate in candidates:
+        sel = om2.MSelectionList()
+        try:
+            sel.add(candidate)
+            dag = sel.getDagPath(0)
+            break
+        except RuntimeError:
+            continue
+    if dag is None:
+        return None, '{} is missing'.format(node)
+
+    if target['component'] is None:
+        return [dag.fullPathName()], None
+
+    if _mesh_fingerprint(dag) != target['topology']:
+        return None, 'the topology of {} has changed'.format(node)
+
+    if dag.apiType() == om2.MFn.kTransform:
+        dag.extendToShape()
+    path = dag.fullPathName()
+    ids = target['ids']
+    return [
+        '{}.{}[{}:{}]'.format(path, target['component'], ids[i], ids[i + 1]) for i in range(0, len(ids), 2)
+    ], None
+
+
+def replay(journal=None, mapping=None):
+    """
+    Runs the steps of a journal again as one undo, with the viewport suspended.
+    Nothing is recorded while it runs.
+    :param journal: SDJournal to replay, JOURNAL if None.
+    :param mapping: Dictionary of recorded node path to the node to use instead, nodes under
+        a recorded path are moved under the new one too.
+    :return: Dictionary of applied step numbers and the skipped and failed steps with the reasons.
+    """
+    if journal is None:
+        journal = JOURNAL
+    mapping = mapping or {}
+    start = time.time()
+    report = {'applied': [], 'skipped': [], 'failed': []}
+
+    sel = mc.ls(selection=True, long=True) or []
+    _DEPTH[0] += 1
+    try:
+        with sdd.fast_edit():
+            for i, step in enumerate(journal.steps):
+                if step['op'] not in OPERATIONS:
+                    report['skipped'].append({'step': i, 'op': step['op'], 'reasons': ['unknown op']})
+                    continue
+
+                names = []
+                reasons = []
+                for target in step['targets']:
+                    target_names, reason = _resolve(target, mapping)
+                    if reason:
+                        reasons.append(reason)
+                    else:
+                        names.extend(target_names)
+
+                if reasons:
+                    report['skipped'].append({'step': i, 'op': step['op'], 'reasons': reasons})
+                    continue
+
+                if names:
+                    mc.select(names, replace=True)
+                else:
+                    mc.select(clear=True)
+                try:
+                    OPERATIONS[step['op']](**step['params'])
+                except (RuntimeError, TypeError, ValueError) as ex:
+                    report['failed'].append({'step': i, 'op': step['op'], 'reasons': [str(ex)]})
+                else:
+                    report['applied'].append(i)
+    finally:
+        _DEPTH[0] -= 1
+        sel = [s for s in sel if mc.objExists(s)]
+        if sel:
+            mc.select(sel, replace=True)
+        else:
+            mc.select(clear=True)
+
+    report['seconds'] = time.time() - start
+    for skipped in report['skipped'] + report['failed']:
+        mc.warning('step {} ({}) not applied: {}'.format(
+            skipped['step'], skipped['op'], ', '.join(skipped['reasons'])
+        ))
+    return report
@@ -0,0 +1,1130 @@
+"""
+Bulk mesh data helpers
+created by: Sean Disero
+
+Reads mesh data through the maya api a whole mesh at a time instead of one
+component at a time, and writes results back as a single undoable command.
+
+Edits are kept as compact arrays of the affected components only, so the undo
+queue grows with the size of the change and not with the number of faces processed.
+
+Where the api hands out a pointer to the mesh's own buffers (object space points and
+normals) they are copied into an array in one block, without a python object per element.
+Everything else is read with one api call per mesh and flattened into arrays.
+
+Edits are written straight onto the shape. Meshes with construction history would lose
+that at their next evaluation, so their edits go through the matching maya command instead
+(eg. polyNormalPerVertex), which adds to the history like running it by hand would.
+Each edit makes one node, however many different values it sets.
+
+License: MIT
+"""
+
+import os
+import ctypes
+import hashlib
+from array import array
+
+import maya.cmds as mc
+from maya import OpenMaya as om
+import maya.api.OpenMaya as om2
+
+import sd_compute as sdc
+
+
+UNDO_PLUGIN = 'sd_mesh_undo_plugin'
+UNDO_COMMAND = 'sdMeshEdit'
+
+# edits waiting to be picked up by the sdMeshEdit command.
+_PENDING_EDITS = []
+
+# how many meshes face_vertices keeps the topology of.
+TOPOLOGY_CACHE_SIZE = 64
+
+# an edit smaller than this part of its mesh reads and writes its components one at a time
+# instead of copying the whole mesh, so streamed chunks stay small on huge meshes.
+SMALL_EDIT = 0.25
+
+_COMPONENT_COUNTS = {
+    om2.MFn.kMeshVertComponent: lambda fn: fn.numVertices,
+    om2.MFn.kMeshEdgeComponent: lambda fn: fn.numEdges,
+    om2.MFn.kMeshPolygonComponent: lambda fn: fn.numPolygons,
+    om2.MFn.kMeshMapComponent: lambda fn: fn.numUVs(),
+}
+
+
+def get_dag_path(node):
+    """
+    Finds the mesh shape dag path of a node.
+    :param node: Name or PyNode of a mesh or its transform.
+    :return: MDagPath to the mesh shape.
+    """
+    sel = om2.MSelectionList()
+    sel.add(str(node))
+    dag = sel.getDagPath(0)
+
+    if dag.apiType() == om2.MFn.kTransform:
+        dag.extendToShape()
+
+    if not dag.hasFn(om2.MFn.kMesh):
+        raise TypeError('{} is not a mesh'.format(node))
+
+    return dag
+
+
+def shape_key(dag):
+    """
+    Identifies the shape node itself, every instance of a shape gives the same key.
+    The key is the path of the shape's first instance, uuids aren't used as copies of
+    a file referenced more than once share them.
+    """
+    return om2.MFnDagNode(dag.node()).fullPathName()
+
+
+def geometry_fingerprint(*arrays):
+    """
+    Hash of mesh data, duplicated meshes with the same topology and points give the same fingerprint.
+    :param arrays: The arrays describing the mesh, eg. offsets, vertex_ids and points.
+    :return: Hex digest string.
+    """
+    digest = hashlib.md5()
+    for data in arrays:
+        digest.update(array(data.typecode, [len(data)]))
+        digest.update(data)
+    return digest.hexdigest()
+
+
+def topology_fingerprint(fn):
+    """
+    Hash of the face layout and uv count of a mesh, it only changes when component ids could.
+    :param fn: MFnMesh
+    :return: Hex digest string.
+    """
+    offsets, vertex_ids = face_vertices(fn)
+    return geometry_fingerprint(offsets, vertex_ids, array('i', [fn.numUVs()]))
+
+
+def has_history(dag):
+    """
+    :return: True if the mesh is driven by construction history.
+    """
+    return om2.MFnDependencyNode(dag.node()).findPlug('inMesh', False).isDestination
+
+
+def component_names(dag, component, ids):
+    """
+    Builds component names with consecutive ids collapsed into ranges, so commands get
+    a handful of strings instead of one per component.
+    :param dag: MDagPath of the mesh.
+    :param component: Component attribute, eg. 'vtx', 'e', 'f' or 'map'.
+    :param ids: Sorted component ids.
+    :return: List of names like 'pCubeShape1.f[0:12]'.
+    """
+    path = dag.fullPathName()
+    names = []
+    start = prev = None
+    for i in ids:
+        if start is None:
+            start = prev = i
+        elif i == prev + 1:
+            prev = i
+        else:
+            names.append('{}.{}[{}:{}]'.format(path, component, start, prev))
+            start = prev = i
+    if start is not None:
+        names.append('{}.{}[{}:{}]'.format(path, component, start, prev))
+    return names
+
+
+def components_by_mesh(nodes=None, component_type=om2.MFn.kMeshPolygonComponent):
+    """
+    Groups the selection by mesh shape, instanced shapes are only listed once.
+    Objects that are selected without components count as all of their components.
+    :param nodes: Nodes or components to use, the active selection if None.
+    :param component_type: The MFn type of component to collect.
+    :return: List of (MDagPath, array of component ids) in selection order.
+    """
+    return [(dag, next(chunks)) for dag, chunks in stream_components(nodes, component_type)]
+
+
+def chunked(ids, chunk_size=None):
+    """
+    Splits ids into arrays of at most chunk_size, all of them in one array if chunk_size is None.
+    """
+    if chunk_size is None:
+        yield ids
+        return
+    for start in xrange(0, len(ids), chunk_size):
+        yield ids[start:start + chunk_size]
+
+
+def _range_chunks(count, chunk_size=None):
+    """
+    chunked for every id of a whole mesh, without making the full list first.
+    """
+    chunk_size = chunk_size or count
+    for start in xrange(0, count, chunk_size):
+        yield array('i', xrange(start, min(start + chunk_size, count)))
+
+
+def _sorted_ids(ids):
+    ids = array('i', ids)
+    if any(ids[i] >= ids[i + 1] for i in xrange(len(ids) - 1)):
+        ids = array('i', sorted(set(ids)))
+    return ids
+
+
+def stream_components(nodes=None, component_type=om2.MFn.kMeshPolygonComponent, chunk_size=None):
+    """
+    Groups the selection by mesh shape and hands out the ids of each mesh in chunks,
+    instanced shapes are only listed once. Objects selected without components count as all
+    of their components, without ever being turned into a list of ids.
+    :param nodes: Nodes or components to use, the active selection if None.
+    :param component_type: The MFn type of component to collect.
+    :param chunk_size: Most ids in a chunk, one chunk per mesh if None.
+    :return: Generator of (MDagPath, generator of arrays of component ids).
+    """
+    sel = om2.MSelectionList()
+    if nodes is None:
+        sel = om2.MGlobal.getActiveSelectionList()
+    else:
+        for node in nodes:
+            sel.add(str(node))
+
+    order = []
+    # shape key: [dag, whole mesh selected, component ids of each selection item]
+    found = {}
+    for i in range(sel.length()):
+        try:
+            dag, comp = sel.getComponent(i)
+        except (RuntimeError, TypeError):
+            continue
+
+        if dag.apiType() == om2.MFn.kTransform:
+            try:
+                dag.extendToShape()
+            except RuntimeError:
+                continue
+
+        if not dag.hasFn(om2.MFn.kMesh):
+            continue
+
+        key = shape_key(dag)
+        if key not in found:
+            found[key] = [dag, False, []]
+            order.append(key)
+
+        if comp.isNull():
+            found[key][1] = True
+        elif comp.apiType() == component_type:
+            found[key][2].append(om2.MFnSingleIndexedComponent(comp).getElements())
+
+    for key in order:
+        dag, whole, selected = found.pop(key)
+        if whole:
+            count = _COMPONENT_COUNTS[component_type](om2.MFnMesh(dag))
+            if count:
+                yield dag, _range_chunks(count, chunk_size)
+        elif selected:
+            if len(selected) == 1:
+                ids = _sorted_ids(selected[0])
+            else:
+                ids = array('i', sorted(set(i for elements in selected for i in elements)))
+            del selected[:]
+            if ids:
+                yield dag, chunked(ids, chunk_size)
+
+
+class TopologyCache(object):
+    """
+    Keeps the face vertex layout of recently used meshes so repeat runs don't read it again.
+    An entry is dropped as soon as maya reports a topology change on its mesh,
+    and everything is dropped when a scene is opened or a new one is made.
+    """
+
+    def __init__(self, size=TOPOLOGY_CACHE_SIZE):
+        self.size = size
+        # shape key: (topology, callback id, MObjectHandle of the shape), oldest first.
+        self.entries = {}
+        self.order = []
+        self.scene_callbacks = [
+            om2.MSceneMessage.addCallback(om2.MSceneMessage.kAfterOpen, self._scene_changed),
+            om2.MSceneMessage.addCallback(om2.MSceneMessage.kAfterNew, self._scene_changed),
+        ]
+
+    def get(self, fn):
+        node = fn.object()
+        key = om2.MFnDagNode(node).fullPathName()
+        entry = self.entries.get(key)
+        if entry is not None:
+            # a path can be taken over by another node after a rename or delete.
+            if len(entry) > 2 and entry[2].isValid() and entry[2].object() == node:
+                self.order.remove(key)
+                self.order.append(key)
+                return entry[0]
+            self.drop(key)
+
+        topology = _read_face_vertices(fn)
+        callback = om2.MPolyMessage.addPolyTopologyChangedCallback(node, self._topology_changed, key)
+        self.entries[key] = (topology, callback, om2.MObjectHandle(node))
+        self.order.append(key)
+
+        while len(self.order) > self.size:
+            self.drop(self.order[0])
+
+        return topology
+
+    def drop(self, key):
+        if key in self.entries:
+            entry = self.entries.pop(key)
+            self.order.remove(key)
+            om2.MMessage.removeCallback(entry[1])
+
+    def clear(self):
+        for key in list(self.order):
+            self.drop(key)
+
+    def remove(self):
+        """
+        Clears the cache and removes all of its callbacks.
+        """
+        self.clear()
+        om2.MMessage.removeCallbacks(self.scene_callbacks)
+        self.scene_callbacks = []
+
+    def _topology_changed(self, node, key):
+        self.drop(key)
+
+    def _scene_changed(self, *args):
+        self.clear()
+
+
+def face_vertices(fn):
+    """
+    The face vertex layout of a mesh, cached until its topology changes.
+    The arrays are shared, don't change them.
+    :param fn: MFnMesh
+    :return: (offsets, vertex_ids), the vertices of face f are vertex_ids[offsets[f]:offsets[f + 1]].
+    """
+    return TOPOLOGY_CACHE.get(fn)
+
+
+def _read_face_vertices(fn):
+    counts, vertex_ids = fn.getVertices()
+
+    offsets = array('i', [0])
+    total = 0
+    for count in counts:
+        total += count
+        offsets.append(total)
+
+    return offsets, array('i', vertex_ids)
+
+
+# kept when the module is reloaded (sd_utils reloads it on import) so the cached topology stays warm,
+# it is moved over to the new class so it runs the new code.
+try:
+    TOPOLOGY_CACHE.__class__ = TopologyCache
+except NameError:
+    TOPOLOGY_CACHE = TopologyCache()
+
+
+def _api1_mesh(fn):
+    sel = om.MSelectionList()
+    sel.add(fn.fullPathName())
+    dag = om.MDagPath()
+    sel.getDagPath(0, dag)
+    return om.MFnMesh(dag)
+
+
+def _copy_raw(pointer, typecode, count):
+    """
+    Copies count items from a pointer the api handed out into an array, as one block of memory.
+    """
+    data = array(typecode)
+    data.fromstring(ctypes.string_at(int(pointer), data.itemsize * count))
+    return data
+
+
+def _read_raw(fn, name, count):
+    """
+    Reads one of the float buffers the old api exposes on MFnMesh, eg. getRawPoints.
+    :return: array of floats, None if the buffer couldn't be read.
+    """
+    try:
+        return _copy_raw(getattr(_api1_mesh(fn), name)(), 'f', count)
+    except (AttributeError, RuntimeError, TypeError, ValueError):
+        return None
+
+
+def read_points(fn, space=om2.MSpace.kObject):
+    """
+    Reads the vertex positions of a mesh.
+    :param fn: MFnMesh
+    :return: array of flat xyz, floats in object space (how maya stores them), doubles otherwise.
+    """
+    if space == om2.MSpace.kObject:
+        points = _read_raw(fn, 'getRawPoints', fn.numVertices * 3)
+        if points is not None:
+            return points
+
+    points = array('f' if space == om2.MSpace.kObject else 'd')
+    for p in fn.getPoints(space):
+        points.extend((p.x, p.y, p.z))
+    return points
+
+
+class PointBuffer(object):
+    """
+    The object space points of a mesh read in place from maya's own buffer, nothing is copied.
+    Index it like the array read_points gives, it is only good until the mesh is next changed.
+    """
+
+    def __init__(self, fn):
+        # the function set is kept so the buffer it points into stays alive.
+        self.mesh = _api1_mesh(fn)
+        count = fn.numVertices * 3
+        self.values = (ctypes.c_float * count).from_address(int(self.mesh.getRawPoints()))
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, index):
+        return self.values[index]
+
+
+def point_buffer(fn):
+    """
+    :param fn: MFnMesh
+    :return: A PointBuffer for the mesh, or the points read with read_points if its buffer can't be read.
+    """
+    try:
+        return PointBuffer(fn)
+    except (AttributeError, RuntimeError, TypeError, ValueError):
+        return read_points(fn)
+
+
+def read_points_at(fn, vertex_ids, space=om2.MSpace.kObject):
+    """
+    Reads the positions of some of the vertices of a mesh, without reading the rest.
+    :param fn: MFnMesh
+    :return: array of flat xyz, one per vertex id, the same values read_points gives.
+    """
+    if space == om2.MSpace.kObject:
+        points = point_buffer(fn)
+        values = array('f')
+        for v in vertex_ids:
+            values.extend(points[v * 3:v * 3 + 3])
+        return values
+
+    values = array('d')
+    for v in vertex_ids:
+        p = fn.getPoint(v, space)
+        values.extend((p.x, p.y, p.z))
+    return values
+
+
+def read_normals(fn, space=om2.MSpace.kObject):
+    """
+    Reads the normals of a mesh by normal id, see MFnMesh.getNormalIds for which face vertex uses which.
+    :param fn: MFnMesh
+    :return: array of flat xyz floats.
+    """
+    if space == om2.MSpace.kObject:
+        normals = _read_raw(fn, 'getRawNormals', fn.numNormals * 3)
+        if normals is not None:
+            return normals
+
+    normals = array('f')
+    for n in fn.getNormals(space):
+        normals.extend((n.x, n.y, n.z))
+    return normals
+
+
+def read_tweaks(dag, vertex_ids):
+    """
+    Reads the tweak (pnts) of the given vertices, only vertices that have one are looked at.
+    :param dag: MDagPath of the mesh.
+    :return: array of flat xyz floats, one per vertex id.
+    """
+    plug = om2.MFnDependencyNode(dag.node()).findPlug('pnts', False)
+    existing = set(plug.getExistingArrayAttributeIndices())
+
+    tweaks = array('f')
+    for v in vertex_ids:
+        if v in existing:
+            element = plug.elementByLogicalIndex(v)
+            tweaks.extend((element.child(0).asFloat(), element.child(1).asFloat(), element.child(2).asFloat()))
+        else:
+            tweaks.extend((0.0, 0.0, 0.0))
+    return tweaks
+
+
+def read_edges(dag):
+    """
+    Reads the two vertices and the smoothing of every edge in one pass over the edges.
+    :param dag: MDagPath of the mesh.
+    :return: (array of flat (vertex a, vertex b), array with 1 for each smooth edge) in edge id order.
+    """
+    edge_vertices = array('i')
+    smooth = array('b')
+    edge_it = om2.MItMeshEdge(dag)
+    while not edge_it.isDone():
+        edge_vertices.extend((edge_it.vertexId(0), edge_it.vertexId(1)))
+        smooth.append(1 if edge_it.isSmooth else 0)
+        edge_it.next()
+    return edge_vertices, smooth
+
+
+def read_uv_ids(fn, uv_set=None):
+    """
+    Reads which uv each face vertex uses.
+    :param fn: MFnMesh
+    :param uv_set: The uv set to read, the current one if None.
+    :return: (uv counts per face, uv ids per face vertex) as arrays.
+    """
+    uv_set = uv_set or fn.currentUVSetName()
+    counts, uv_ids = fn.getAssignedUVs(uv_set)
+    return array('i', counts), array('i', uv_ids)
+
+
+def normal_locks(fn):
+    """
+    MFnMesh.isNormalLocked that only asks maya once per normal id,
+    many face vertices share a normal id so most lookups come from the cache.
+    :param fn: MFnMesh
+    :return: Function taking a normal id and returning True if it is locked.
+    """
+    locked = {}
+
+    def is_locked(normal_id):
+        if normal_id not in locked:
+            locked[normal_id] = fn.isNormalLocked(normal_id)
+        return locked[normal_id]
+    return is_locked
+
+
+def read_face_vertex_normals(fn, space=om2.MSpace.kObject):
+    """
+    Reads the normal of every face vertex, in the same order as face_vertices.
+    :param fn: MFnMesh
+    :return: (array of flat xyz normals, array with 1 for each locked face vertex normal)
+    """
+    normal_counts, normal_ids = fn.getNormalIds()
+    mesh_normals = read_normals(fn, space)
+
+    is_locked = normal_locks(fn)
+    normals = array('f')
+    locked = array('b')
+    for normal_id in normal_ids:
+        normals.extend(mesh_normals[normal_id * 3:normal_id * 3 + 3])
+        locked.append(1 if is_locked(normal_id) else 0)
+
+    return normals, locked
+
+
+def read_face_vertex_data(dag, space=om2.MSpace.kObject, locked_only=False):
+    """
+    Reads everything about the face vertices of a mesh into flat arrays.
+    :param dag: MDagPath of the mesh.
+    :param locked_only: Only keep the face vertices with locked normals.
+    :return: Dictionary of
+        face_ids, vertex_ids - which face and vertex each face vertex is.
+        positions - xyz of the vertex.
+        face_normals - unit xyz normal of the face.
+        normals - xyz of the face vertex normal.
+    """
+    fn = om2.MFnMesh(dag)
+    offsets, vertex_ids = face_vertices(fn)
+    normal_counts, normal_ids = fn.getNormalIds()
+    return sdc.face_vertex_data(
+        read_points(fn, space),
+        offsets,
+        vertex_ids,
+        normal_ids,
+        read_normals(fn, space),
+        normal_locks(fn) if locked_only else None
+    )
+
+
+def _vector_array(flat):
+    return om2.MVectorArray([
+        om2.MVector(flat[i], flat[i + 1], flat[i + 2]) for i in range(0, len(flat), 3)
+    ])
+
+
+class NormalEdit(object):
+    """
+    Before and after per face vertex normals for one mesh.
+    Everything is stored as flat arrays, normals as xyz floats.
+    """
+
+    def __init__(self, dag, face_ids, vertex_ids, normals, space=om2.MSpace.kObject, topology=None, indices=None):
+        self.path = dag.fullPathName()
+        self.space = space
+
+        self.face_ids = array('i', face_ids)
+        self.vertex_ids = array('i', vertex_ids)
+        self.after = array('f', normals)
+
+        self.before = array('f')
+        # positions in the edit of normals that were not locked before it ran.
+        self.unlocked = array('i')
+
+        self._read_before(om2.MFnMesh(dag), topology, indices)
+
+    def __len__(self):
+        return len(self.face_ids)
+
+    def _read_before(self, fn, topology=None, indices=None):
+        """
+        :param indices: Position of each face vertex in the mesh's face vertex list if it is known,
+            otherwise it is looked up from the topology.
+        """
+        if len(self.face_ids) < fn.numFaceVertices * SMALL_EDIT:
+            return self._read_before_at(fn)
+
+        if indices is None:
+            offsets, vertex_ids = topology or face_vertices(fn)
+            indices = array('i')
+            for f, v in zip(self.face_ids, self.vertex_ids):
+                for k in range(offsets[f], offsets[f + 1]):
+                    if vertex_ids[k] == v:
+                        break
+                indices.append(k)
+
+        normal_counts, normal_ids = fn.getNormalIds()
+        normals = read_normals(fn, self.space)
+        is_locked = normal_locks(fn)
+
+        for i, k in enumerate(indices):
+            normal_id = normal_ids[k]
+            self.before.extend(normals[normal_id * 3:normal_id * 3 + 3])
+            if not is_locked(normal_id):
+                self.unlocked.append(i)
+
+    def _read_before_at(self, fn):
+        """
+        _read_before for a few face vertices, asks for just those instead of reading every normal.
+        """
+        is_locked = normal_locks(fn)
+        # face id: {vertex id: normal id}
+        face_normal_ids = {}
+        for i, (f, v) in enumerate(zip(self.face_ids, self.vertex_ids)):
+            if f not in face_normal_ids:
+                face_normal_ids[f] = dict(zip(fn.getPolygonVertices(f), fn.getFaceNormalIds(f)))
+            n = fn.getFaceVertexNormal(f, v, self.space)
+            self.before.extend((n.x, n.y, n.z))
+            if not is_locked(face_normal_ids[f][v]):
+                self.unlocked.append(i)
+
+    @classmethod
+    def around_vertices(cls, dag, vertex_normals, space=om2.MSpace.kObject, topology=None):
+        """
+        from_vertex_normals for a few vertices of a big mesh, only the faces around them are looked at.
+        :param dag: MDagPath of the mesh.
+        :param vertex_normals: Dictionary of vertex id to an (x, y, z) normal.
+        :param topology: (offsets, vertex_ids) of the mesh if it has already been read.
+        :return: NormalEdit
+        """
+        vertex_it = om2.MItMeshVertex(dag)
+
+        face_ids = array('i')
+        edit_vertex_ids = array('i')
+        normals = array('f')
+        for v in sorted(vertex_normals):
+            vertex_it.setIndex(v)
+            for f in vertex_it.getConnectedFaces():
+                face_ids.append(f)
+                edit_vertex_ids.append(v)
+                normals.extend(vertex_normals[v])
+
+        return cls(dag, face_ids, edit_vertex_ids, normals, space, topology)
+
+    @classmethod
+    def from_vertex_normals(cls, dag, vertex_normals, space=om2.MSpace.kObject, topology=None):
+        """
+        Builds an edit that sets every face vertex of the given vertices.
+        :param dag: MDagPath of the mesh.
+        :param vertex_normals: Dictionary of vertex id to an (x, y, z) normal.
+        :param topology: (offsets, vertex_ids) of the mesh if it has already been read.
+        :return: NormalEdit
+        """
+        topology = topology or face_vertices(om2.MFnMesh(dag))
+        face_ids, edit_vertex_ids, normals, indices = sdc.face_vertex_normals(
+            topology[0], topology[1], vertex_normals
+        )
+        return cls(dag, face_ids, edit_vertex_ids, normals, space, topology, indices)
+
+    def apply_command(self):
+        """
+        Sets the after normals through a single polyNormalPerVertex node, for meshes with construction history.
+        The command makes the node for every face vertex at once, then each face vertex's
+        normal is written into the node's normalPerVertex data.
+        :return: NormalNodeEdit that writes the normals into the node, apply it with the other edits.
+        """
+        dag = get_dag_path(self.path)
+        to_object = None
+        if self.space != om2.MSpace.kObject:
+            # normals go from world to object space by the transpose of the world matrix.
+            to_object = dag.inclusiveMatrix().transpose()
+
+        normals = self.after
+        if to_object is not None:
+            normals = array('f')
+            for i in range(len(self.face_ids)):
+                n = (om2.MVector(self.after[i * 3], self.after[i * 3 + 1], self.after[i * 3 + 2]) * to_object).normal()
+                normals.extend((n.x, n.y, n.z))
+
+        names = [
+            '{}.vtxFace[{}][{}]'.format(self.path, v, f) for f, v in zip(self.face_ids, self.vertex_ids)
+        ]
+        node = mc.polyNormalPerVertex(names, xyz=tuple(normals[0:3]))[0]
+        return NormalNodeEdit(node, self.face_ids, self.vertex_ids, normals)
+
+    def redo(self):
+        fn = om2.MFnMesh(get_dag_path(self.path))
+        fn.setFaceVertexNormals(
+            _vector_array(self.after),
+            om2.MIntArray(self.face_ids),
+            om2.MIntArray(self.vertex_ids),
+            self.space
+        )
+
+    def undo(self):
+        fn = om2.MFnMesh(get_dag_path(self.path))
+        fn.setFaceVertexNormals(
+            _vector_array(self.before),
+            om2.MIntArray(self.face_ids),
+            om2.MIntArray(self.vertex_ids),
+            self.space
+        )
+        if self.unlocked:
+            fn.unlockFaceVertexNormals(
+                om2.MIntArray([self.face_ids[i] for i in self.unlocked]),
+                om2.MIntArray([self.vertex_ids[i] for i in self.unlocked])
+            )
+
+
+class NormalNodeEdit(object):
+    """
+    Face vertex normals held by a polyNormalPerVertex node, see NormalEdit.apply_command.
+    The node is looked up by name, so redo finds it again after its command is redone.
+    """
+
+    def __init__(self, node, face_ids, vertex_ids, normals):
+        self.node = node
+        self.face_ids = array('i', face_ids)
+        self.vertex_ids = array('i', vertex_ids)
+        self.after = array('f', normals)
+        self.before = array('f')
+        for plug in self._plugs():
+            self.before.extend((plug.child(0).asFloat(), plug.child(1).asFloat(), plug.child(2).asFloat()))
+
+    def __len__(self):
+        return len(self.face_ids)
+
+    def _plugs(self):
+        """
+        :return: Generator of the vertexFaceNormalXYZ plug of each face vertex.
+        """
+        sel = om2.MSelectionList()
+        sel.add(self.node)
+        fn = om2.MFnDependencyNode(sel.getDependNode(0))
+        vertex_plug = fn.findPlug('vertexNormal', False)
+        face_attr = fn.attribute('vertexFaceNormal')
+        xyz_attr = fn.attribute('vertexFaceNormalXYZ')
+        for f, v in zip(self.face_ids, self.vertex_ids):
+            face_plug = vertex_plug.elementByLogicalIndex(v).child(face_attr)
+            yield face_plug.elementByLogicalIndex(f).child(xyz_attr)
+
+    def _write(self, values):
+        for i, plug in enumerate(self._plugs()):
+            plug.child(0).setFloat(values[i * 3])
+            plug.child(1).setFloat(values[i * 3 + 1])
+            plug.child(2).setFloat(values[i * 3 + 2])
+
+    def redo(self):
+        self._write(self.after)
+
+    def undo(self):
+        self._write(self.before)
+
+
+class PointEdit(object):
+    """
+    Before and after positions of some of the vertices of one mesh, as flat xyz arrays.
+    The whole point array is written back in one call, unless only a few vertices change.
+    """
+
+    def __init__(self, dag, vertex_ids, points, space=om2.MSpace.kObject):
+        self.path = dag.fullPathName()
+        self.space = space
+
+        self.vertex_ids = array('i', vertex_ids)
+        self.after = array('d', points)
+
+        self.before = array('d', read_points_at(om2.MFnMesh(dag), self.vertex_ids, space))
+
+    def __len__(self):
+        return len(self.vertex_ids)
+
+    def _write(self, values):
+        fn = om2.MFnMesh(get_dag_path(self.path))
+        if len(self.vertex_ids) < fn.numVertices * SMALL_EDIT:
+            for i, v in enumerate(self.vertex_ids):
+                fn.setPoint(v, om2.MPoint(values[i * 3], values[i * 3 + 1], values[i * 3 + 2]), self.space)
+            return
+
+        points = fn.getPoints(self.space)
+        for i, v in enumerate(self.vertex_ids):
+            points[v] = om2.MPoint(values[i * 3], values[i * 3 + 1], values[i * 3 + 2])
+        fn.setPoints(points, self.space)
+
+    def apply_command(self):
+        """
+        Moves the vertices by their tweaks (pnts) with setAttr, for meshes with construction history.
+        Each tweak moves as far as its vertex does, consecutive vertices are set together.
+        """
+        dag = get_dag_path(self.path)
+        to_object = None
+        if self.space != om2.MSpace.kObject:
+            # tweaks are in object space, moves go back by the inverse of the world matrix.
+            to_object = dag.inclusiveMatrixInverse()
+
+        tweaks = read_tweaks(dag, self.vertex_ids)
+        values = array('d')
+        for i in range(len(self.vertex_ids)):
+            move = om2.MVector(
+                self.after[i * 3] - self.before[i * 3],
+                self.after[i * 3 + 1] - self.before[i * 3 + 1],
+                self.after[i * 3 + 2] - self.before[i * 3 + 2],
+            )
+            if to_object is not None:
+                move *= to_object
+            values.extend((tweaks[i * 3] + move.x, tweaks[i * 3 + 1] + move.y, tweaks[i * 3 + 2] + move.z))
+
+        start = 0
+        count = len(self.vertex_ids)
+        for i in range(1, count + 1):
+            if i == count or self.vertex_ids[i] != self.vertex_ids[i - 1] + 1:
+                mc.setAttr(
+                    '{}.pnts[{}:{}]'.format(self.path, self.vertex_ids[start], self.vertex_ids[i - 1]),
+                    *values[start * 3:i * 3], type='float3'
+                )
+                start = i
+
+    def redo(self):
+        self._write(self.after)
+
+    def undo(self):
+        self._write(self.before)
+
+
+class EdgeSmoothEdit(object):
+    """
+    Edges of one mesh to set hard or soft, every edge is stored with the smoothing it ends up with.
+    """
+
+    def __init__(self, dag, edge_ids, smooth):
+        self.path = dag.fullPathName()
+        self.edge_ids = array('i', edge_ids)
+        self.after = array('b', smooth)
+
+    def __len__(self):
+        return len(self.edge_ids)
+
+    def count(self, smooth):
+        """
+        :return: Number of edges the edit makes smooth if smooth is True, hard otherwise.
+        """
+        return sum(1 for s in self.after if bool(s) == smooth)
+
+    def apply_command(self):
+        """
+        Sets the edges with polySoftEdge, one for the hard edges and one for the soft ones,
+        for meshes with construction history.
+        """
+        dag = get_dag_path(self.path)
+        for smooth, angle in ((False, 0), (True, 180)):
+            ids = [e for e, s in zip(self.edge_ids, self.after) if bool(s) == smooth]
+            if ids:
+                mc.polySoftEdge(component_names(dag, 'e', ids), angle=angle)
+
+    def _write(self, smooth):
+        fn = om2.MFnMesh(get_dag_path(self.path))
+        fn.setEdgeSmoothings(om2.MIntArray(self.edge_ids), [bool(s) for s in smooth])
+        fn.cleanupEdgeSmoothing()
+        fn.updateSurface()
+
+    def redo(self):
+        self._write(self.after)
+
+    def undo(self):
+        # only edges that change are kept, so each one was the other way before.
+        self._write([not s for s in self.after])
+
+
+class AttrEdit(object):
+    """
+    Before and after values of numeric attributes, eg. the channels a ui job set over time.
+    Values are in ui units like getAttr gives them, and are written through the api so
+    the sdMeshEdit command is the only thing that goes in the undo queue.
+    """
+
+    def __init__(self, plugs, before, after):
+        self.plugs = list(plugs)
+        self.before = array('d', before)
+        self.after = array('d', after)
+
+    def __len__(self):
+        return len(self.plugs)
+
+    def _write(self, values):
+        sel = om2.MSelectionList()
+        for plug in self.plugs:
+            sel.add(plug)
+        for i, value in enumerate(values):
+            set_plug_value(sel.getPlug(i), value)
+
+    def redo(self):
+        self._write(self.after)
+
+    def undo(self):
+        self._write(self.before)
+
+
+def set_plug_value(plug, value):
+    """
+    Sets a numeric plug from a value in ui units, like setAttr would without going through a command.
+    """
+    attribute = plug.attribute()
+    if attribute.hasFn(om2.MFn.kUnitAttribute):
+        unit_type = om2.MFnUnitAttribute(attribute).unitType()
+        if unit_type == om2.MFnUnitAttribute.kAngle:
+            plug.setMAngle(om2.MAngle(value, om2.MAngle.uiUnit()))
+            return
+        if unit_type == om2.MFnUnitAttribute.kDistance:
+            plug.setMDistance(om2.MDistance(value, om2.MDistance.uiUnit()))
+            return
+    plug.setDouble(value)
+
+
+def read_normal_job(dag, face_ids, mode='flat', min_tolerance=0, max_tolerance=0, space=om2.MSpace.kObject):
+    """
+    Reads what sd_compute.mesh_normal_job needs for one mesh.
+    :param dag: MDagPath of the mesh.
+    :param face_ids: The faces to work on.
+    :param mode: 'flat' or 'regions', see sd_compute.mesh_normal_job.
+    :return: (job dictionary, topology) where topology is the (offsets, vertex_ids) of the mesh.
+    """
+    fn = om2.MFnMesh(dag)
+    offsets, vertex_ids = face_vertices(fn)
+    job = {
+        'key': dag.fullPathName(),
+        'mode': mode,
+        'points': read_points(fn, space),
+        'offsets': offsets,
+        'vertex_ids': vertex_ids,
+        'face_ids': array('i', face_ids),
+        'min_tolerance': min_tolerance,
+        'max_tolerance': max_tolerance,
+    }
+    return job, (offsets, vertex_ids)
+
+
+def normal_job_fingerprint(dag, face_ids):
+    """
+    Fingerprint of the mesh and faces read_normal_job would read, taken without copying the points
+    or caching the topology, so duplicated meshes can be matched before anything else is read.
+    :param dag: MDagPath of the mesh.
+    :param face_ids: The faces to work on.
+    :return: Hex digest string.
+    """
+    fn = om2.MFnMesh(dag)
+    counts, vertex_ids = fn.getVertices()
+    try:
+        # the buffer is kept until the digest is done, it holds maya's points alive.
+        buffer = PointBuffer(fn)
+        points = buffer.values
+    except (AttributeError, RuntimeError, TypeError, ValueError):
+        points = read_points(fn)
+
+    digest = hashlib.md5()
+    for data in (array('i', counts), array('i', vertex_ids), points, array('i', face_ids)):
+        digest.update(array('i', [len(data)]))
+        digest.update(data)
+    return digest.hexdigest()
+
+
+def normal_job_edit(dag, result, topology=None, space=om2.MSpace.kObject):
+    """
+    Turns the result of sd_compute.mesh_normal_job back into a NormalEdit.
+    The face vertices were already worked out by the job, only the before values are read here.
+    """
+    key, face_ids, vertex_ids, normals, indices = result
+    return NormalEdit(dag, face_ids, vertex_ids, normals, space, topology, indices)
+
+
+def flat_surface_edits(dag, chunks, space=om2.MSpace.kObject):
+    """
+    Gives the vertices of each face the normal of that face, one edit for each chunk of faces.
+    Apply each edit before asking for the next one, then where chunks share a vertex the
+    later chunk wins, just like the last face does within a chunk.
+    :param dag: MDagPath of the mesh.
+    :param chunks: Arrays of face ids, eg. from stream_components.
+    :return: Generator of NormalEdit.
+    """
+    # read past the topology cache, it would keep every streamed mesh's topology alive.
+    # the edits only change normals, so the one read is good for every chunk.
+    offsets, vertex_ids = _read_face_vertices(om2.MFnMesh(dag))
+    for face_ids in chunks:
+        fn = om2.MFnMesh(dag)
+        points = point_buffer(fn) if space == om2.MSpace.kObject else read_points(fn, space)
+        vertex_normals = sdc.flat_vertex_normals(points, offsets, vertex_ids, face_ids)
+        del points
+        yield NormalEdit.around_vertices(dag, vertex_normals, space, (offsets, vertex_ids))
+
+
+def read_transfer_source(source):
+    """
+    Reads the locked normals of a mesh for sd_compute.transfer_normals, in world space.
+    :param source: Name or PyNode of the mesh.
+    :return: Dictionary of face vertex arrays, see read_face_vertex_data.
+    """
+    return read_face_vertex_data(get_dag_path(source), om2.MSpace.kWorld, locked_only=True)
+
+
+def read_transfer_job(dag, source, max_distance=None, min_dot=0.5):
+    """
+    Reads what sd_compute.transfer_job needs to transfer onto one mesh.
+    :param dag: MDagPath of the mesh to transfer onto.
+    :param source: Result of read_transfer_source.
+    :param max_distance: Furthest a match can be, worked out from the source if None.
+    :param min_dot: Smallest dot product between the source and target face normals for a match.
+    :return: Job dictionary.
+    """
+    return {
+        'key': dag.fullPathName(),
+        'source': source,
+        'target': read_face_vertex_data(dag, om2.MSpace.kWorld),
+        'max_distance': max_distance,
+        'min_dot': min_dot,
+    }
+
+
+def transfer_job_edit(dag, result):
+    """
+    Turns the result of sd_compute.transfer_job back into a NormalEdit.
+    """
+    key, face_ids, vertex_ids, normals = result
+    return NormalEdit(dag, face_ids, vertex_ids, normals, om2.MSpace.kWorld)
+
+
+def edge_hardness_edit(dag, edge_ids, threshold=30.0, uv_seams=False):
+    """
+    Hardens the edges sharper than the threshold and softens the rest.
+    Edges that are already right are left out, border edges are never changed.
+    :param dag: MDagPath of the mesh.
+    :param edge_ids: The edges to set.
+    :param threshold: Angle in degrees between faces above which an edge is hard.
+    :param uv_seams: Also harden uv seam edges.
+    :return: EdgeSmoothEdit
+    """
+    fn = om2.MFnMesh(dag)
+    offsets, vertex_ids = face_vertices(fn)
+    edge_vertices, smooth = read_edges(dag)
+
+    angles = sdc.edge_angles(read_points(fn), offsets, vertex_ids, edge_vertices)
+    seams = ()
+    if uv_seams:
+        uv_counts, uv_ids = read_uv_ids(fn)
+        seams = sdc.uv_seam_edges(offsets, vertex_ids, uv_counts, uv_ids, edge_vertices)
+
+    hard, soft = sdc.edge_hardness(angles, threshold, seams)
+
+    wanted = set(edge_ids)
+    changed = {}
+    for e in hard:
+        if e in wanted and smooth[e]:
+            changed[e] = 0
+    for e in soft:
+        if e in wanted and not smooth[e]:
+            changed[e] = 1
+
+    ids = sorted(changed)
+    return EdgeSmoothEdit(dag, ids, [changed[e] for e in ids])
+
+
+def edge_average_edit(dag, edge_ids, space=om2.MSpace.kObject):
+    """
+    Sets the vertices of each edge to the average normal of the two faces on either side of it.
+    Border edges are skipped.
+    :param dag: MDagPath of the mesh.
+    :param edge_ids: The edges to average.
+    :return: NormalEdit
+    """
+    fn = om2.MFnMesh(dag)
+    edge_it = om2.MItMeshEdge(dag)
+
+    vertex_normals = {}
+    for e in edge_ids:
+        edge_it.setIndex(e)
+        faces = edge_it.getConnectedFaces()
+        if len(faces) != 2:
+            continue
+
+        n = (fn.getPolygonNormal(faces[0], space) + fn.getPolygonNormal(faces[1], space)).normal()
+        vertex_normals[edge_it.vertexId(0)] = (n.x, n.y, n.z)
+        vertex_normals[edge_it.vertexId(1)] = (n.x, n.y, n.z)
+
+    return NormalEdit.from_vertex_normals(dag, vertex_normals, space)
+
+
+def take_pending_edits():
+    """
+    Hands the pending edits over to the sdMeshEdit command.
+    """
+    edits = list(_PENDING_EDITS)
+    del _PENDING_EDITS[:]
+    return edits
+
+
+def load_undo_plugin():
+    if not mc.pluginInfo(UNDO_PLUGIN, query=True, loaded=True):
+        plugin_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), UNDO_PLUGIN + '.py')
+        mc.loadPlugin(plugin_path, quiet=True)
+
+
+def apply_edits(edits):
+    """
+    Applies the edits as a single undoable command.
+    Edits on meshes with construction history are applied through their apply_command instead,
+    whatever edit that hands back goes into the command with the rest.
+    Run it inside an undo chunk (eg. fast_edit) so they still undo together.
+    :param edits: List of edits, anything with redo and undo methods.
+    :return: None
+    """
+    direct = []
+    for edit in edits:
+        if not len(edit):
+            continue
+        path = getattr(edit, 'path', None)
+        if path and has_history(get_dag_path(path)):
+            # the command may leave values to write, eg. into the node it made.
+            written = edit.apply_command()
+            if written is not None:
+                direct.append(written)
+        else:
+            direct.append(edit)
+
+    edits = direct
+    if not edits:
+        return None
+
+    load_undo_plugin()
+
+    _PENDING_EDITS[:] = edits
+    getattr(mc, UNDO_COMMAND)()
+
+    return None
@@ -0,0 +1,380 @@
+"""
+Multi mesh processing for the sd tools
+created by: Sean Disero
+
+When many meshes are selected the work is split into three stages:
+    read - each mesh is read into arrays on the main thread.
+    compute - sd_compute runs on the arrays in a pool of worker processes that never touch maya,
+        working out the normals (or matching the transferred ones) and every face vertex they go on.
+    write - the before values are read and the results written back on the main thread
+        as soon as each one is done.
+reading the next mesh overlaps with the workers computing the earlier ones, so a big
+selection takes about as long as its slowest mesh instead of the sum of all of them.
+duplicated meshes are fingerprinted and only computed once.
+
+The pool is started once and kept around, its workers are mayapy processes fed over pipes.
+Workers that die, or hang on a job for longer than JOB_TIMEOUT, are started again
+and the job they had is run on the main thread.
+If mayapy can't be found or started everything runs on the main thread instead.
+
+License: MIT
+"""
+
+import os
+import sys
+import time
+import Queue
+import threading
+import subprocess
+import cPickle as pickle
+import multiprocessing
+
+import maya.cmds as mc
+
+import sd_compute as sdc
+import sd_mesh_io as sdio
+
+
+# seconds to wait between checks on the workers once every mesh has been read.
+POLL_INTERVAL = 0.005
+
+# seconds a worker gets for one job before it is taken to be hung, killed and the job run on the main thread.
+JOB_TIMEOUT = 120.0
+
+# the pool is kept when the module is reloaded so its workers aren't orphaned.
+try:
+    _POOL
+except NameError:
+    _POOL = None
+    _POOL_SIZE = None
+
+
+def _mayapy_path():
+    maya_location = os.environ.get('MAYA_LOCATION')
+    if not maya_location:
+        return None
+    name = 'mayapy.exe' if sys.platform.startswith('win') else 'mayapy'
+    path = os.path.join(maya_location, 'bin', name)
+    return path if os.path.isfile(path) else None
+
+
+class SDJobResult(object):
+    """
+    Result of a job sent to an SDWorkerPool, filled in by the thread that talks to the worker.
+    """
+
+    def __init__(self):
+        self._done = threading.Event()
+        self._value = None
+        self._error = None
+        # set when a worker picks the job up.
+        self.worker = None
+        self.process = None
+        self.started = None
+
+    def set(self, value, error=None):
+        self._value = value
+        self._error = error
+        self._done.set()
+
+    def ready(self):
+        return self._done.is_set()
+
+    def get(self):
+        self._done.wait()
+        if self._error:
+            raise RuntimeError('worker job failed:\n{}'.format(self._error))
+        return self._value
+
+
+class SDWorkerPool(object):
+    """
+    mayapy processes running sd_compute.serve, each one fed by a thread on the maya side.
+    The workers are new processes on every platform, maya itself is never forked.
+    A worker that dies is started again, by its thread when a job finds it dead or by restart_dead.
+    """
+
+    def __init__(self, mayapy, workers):
+        self.mayapy = mayapy
+        self.script = os.path.splitext(os.path.abspath(sdc.__file__))[0] + '.py'
+        self.jobs = Queue.Queue()
+        self.lock = threading.Lock()
+        self.processes = []
+        self.threads = []
+        for i in range(workers):
+            self.processes.append(self._start())
+            thread = threading.Thread(target=self._feed, args=(i,), name='sd_worker_{}'.format(i))
+            thread.daemon = True
+            thread.start()
+            self.threads.append(thread)
+
+    def _start(self):
+        # -u keeps stdin and stdout unbuffered and binary on windows.
+        return subprocess.Popen([self.mayapy, '-u', self.script], stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+
+    def _restart(self, i, dead):
+        """
+        Starts worker i again if it is still the dead process, the thread and restart_dead can both find it.
+        :return: True if worker i is running.
+        """
+        with self.lock:
+            if self.processes[i] is dead:
+                if dead.poll() is None:
+                    dead.kill()
+                dead.wait()
+                try:
+                    self.processes[i] = self._start()
+                except OSError:
+                    return False
+            return self.processes[i].poll() is None
+
+    def _feed(self, i):
+        while True:
+            item = self.jobs.get()
+            if item is None:
+                return
+            name, args, result = item
+            process = self.processes[i]
+            result.worker = i
+            result.process = process
+            result.started = time.time()
+            try:
+                pickle.dump((name, args), process.stdin, pickle.HIGHEST_PROTOCOL)
+                process.stdin.flush()
+                status, value = pickle.load(process.stdout)
+            except (IOError, EOFError, pickle.PickleError) as ex:
+                # the job is lost with the worker, the next one goes to a new worker.
+                result.set(None, 'lost the worker: {}'.format(ex))
+                self._restart(i, process)
+                continue
+            if status == 'ok':
+                result.set(value)
+            else:
+                result.set(None, value)
+
+    def restart_dead(self):
+        """
+        Starts any worker that has died since it was last used.
+        :return: True if every worker is running.
+        """
+        alive = True
+        for i, process in enumerate(list(self.processes)):
+            if process.poll() is not None:
+                alive = self._restart(i, process) and alive
+        return alive
+
+    def expire(self, result, timeout):
+        """
+        Kills the worker running the job if it has been at it longer than timeout, the job then
+        fails like it would if the worker died and the worker is started again.
+        :return: True if the worker was killed.
+        """
+        if result.ready() or result.started is None or time.time() - result.started < timeout:
+            return False
+        with self.lock:
+            if self.processes[result.worker] is not result.process or result.process.poll() is not None:
+                return False
+            result.process.kill()
+        return True
+
+    def apply_async(self, func, args):
+        """
+        Queues func(*args) for the next free worker, func must be a function of sd_compute.
+        :return: SDJobResult
+        """
+        result = SDJobResult()
+        self.jobs.put((func.__name__, args, result))
+        return result
+
+    def terminate(self):
+        for thread in self.threads:
+            self.jobs.put(None)
+        for process in self.processes:
+            try:
+                process.stdin.close()
+            except IOError:
+                pass
+        for thread in self.threads:
+            thread.join(1.0)
+        for process in self.processes:
+            if process.poll() is None:
+                process.kill()
+            process.wait()
+        self.processes = []
+        self.threads = []
+
+
+def get_pool(workers=None):
+    """
+    The shared worker pool, started the first time it is needed.
+    Workers that have died are started again before the pool is handed out.
+    :param workers: Number of worker processes, one less than the cpu count if None.
+    :return: SDWorkerPool or None if mayapy can't be found or started.
+    """
+    global _POOL, _POOL_SIZE
+
+    if workers is None:
+        workers = max(multiprocessing.cpu_count() - 1, 1)
+
+    if _POOL is not None and _POOL_SIZE == workers and _POOL.restart_dead():
+        return _POOL
+
+    close_pool()
+
+    mayapy = _mayapy_path()
+    if not mayapy:
+        return None
+
+    try:
+        _POOL = SDWorkerPool(mayapy, workers)
+        _POOL_SIZE = workers
+    except OSError as ex:
+        mc.warning('could not start the workers, running on the main thread: {}'.format(ex))
+        close_pool()
+
+    return _POOL
+
+
+def close_pool():
+    global _POOL, _POOL_SIZE
+    if _POOL is not None:
+        _POOL.terminate()
+    _POOL = None
+    _POOL_SIZE = None
+
+
+def run_jobs(items, read, func, workers=None):
+    """
+    Reads a job for each item on the main thread and runs func on it in the worker pool,
+    the next items are read while the workers compute the earlier ones. Only a couple of jobs
+    per worker are read ahead, so a long list of items doesn't hold all of its data at once.
+    A job the workers fail, or that takes longer than JOB_TIMEOUT, is read again and run on the main thread.
+    :param items: List of anything read takes.
+    :param read: Function taking an item and returning the job for it.
+    :param func: The sd_compute function that runs a job.
+    :param workers: Number of worker processes, see get_pool. 0 runs everything on the main thread.
+    :return: Generator of (item, result), in the order they finish.
+    """
+    pool = get_pool(workers) if workers != 0 and len(items) > 1 else None
+    if pool is None:
+        for item in items:
+            yield item, func(read(item))
+        return
+
+    limit = 2 * len(pool.processes)
+    queued = iter(items)
+    # [(item, async result)] for jobs still running, oldest first.
+    pending = []
+    while True:
+        if len(pending) < limit:
+            for item in queued:
+                # the job data is only needed by the worker.
+                pending.append((item, pool.apply_async(func, (read(item),))))
+                if len(pending) >= limit:
+                    break
+
+        if not pending:
+            return
+
+        finished = [entry for entry in pending if entry[1].ready()]
+        if not finished:
+            for item, async_result in pending:
+                if pool.expire(async_result, JOB_TIMEOUT):
+                    mc.warning('a job took longer than {}s, stopped its worker'.format(JOB_TIMEOUT))
+            time.sleep(POLL_INTERVAL)
+            continue
+
+        for entry in finished:
+            pending.remove(entry)
+            item, async_result = entry
+            try:
+                result = async_result.get()
+            except RuntimeError as ex:
+                mc.warning('running a job on the main thread, {}'.format(ex))
+                result = func(read(item))
+            yield item, result
+
+
+def normal_edits(meshes, mode='flat', min_tolerance=0, max_tolerance=0, workers=None):
+    """
+    Runs sd_compute.mesh_normal_job on every mesh and yields the edits as they finish.
+    Duplicated meshes with the same geometry and faces are only computed once,
+    the result is written to all of them.
+    :param meshes: List of (MDagPath, face ids) like sd_mesh_io.components_by_mesh gives.
+    :param mode: 'flat' or 'regions'.
+    :param workers: Number of worker processes, see get_pool. 0 runs everything on the main thread.
+    :return: Generator of NormalEdit, in the order they finish.
+    """
+    # duplicates are matched before any mesh is read, they only read their own before values.
+    # fingerprint: (face ids, [dag, ...]) in selection order.
+    groups = {}
+    order = []
+    for dag, faces in meshes:
+        fingerprint = sdio.normal_job_fingerprint(dag, faces)
+        if fingerprint not in groups:
+            groups[fingerprint] = (faces, [])
+            order.append(fingerprint)
+        groups[fingerprint][1].append(dag)
+
+    def read(fingerprint):
+        faces, dags = groups[fingerprint]
+        return sdio.read_normal_job(dags[0], faces, mode, min_tolerance, max_tolerance)[0]
+
+    for fingerprint, result in run_jobs(order, read, sdc.mesh_normal_job, workers):
+        # the face vertex arrays of the result are shared by every duplicate.
+        for dag in groups.pop(fingerprint)[1]:
+            yield sdio.normal_job_edit(dag, result)
+
+
+def apply_normals(meshes, mode='flat', min_tolerance=0, max_tolerance=0, workers=None):
+    """
+    Works out and writes the normals for every mesh, each mesh is written as soon as it is done.
+    Run it inside a fast_edit so the whole selection is one undo.
+    :return: None
+    """
+    for edit in normal_edits(meshes, mode, min_tolerance, max_tolerance, workers):
+        sdio.apply_edits([edit])
+
+    return None
+
+
+def transfer_edits(source, targets, max_distance=None, min_dot=0.5, workers=None):
+    """
+    Transfers the locked normals of the source to every target, each target is matched by a worker.
+    See sd_compute.transfer_normals for how face vertices are matched.
+    :param source: Mesh to take the locked normals from.
+    :param targets: Meshes to transfer onto, instances of a shape are only transferred onto once.
+    :param max_distance: Furthest a match can be, worked out from the source if None.
+    :param min_dot: Smallest dot product between the source and target face normals for a match.
+    :param workers: Number of worker processes, see get_pool. 0 runs everything on the main thread.
+    :return: Generator of NormalEdit, in the order they finish.
+    """
+    captured = sdio.read_transfer_source(source)
+    if not captured['face_ids']:
+        return
+
+    dags = []
+    seen = set()
+    for target in targets:
+        dag = sdio.get_dag_path(target)
+        if sdio.shape_key(dag) not in seen:
+            seen.add(sdio.shape_key(dag))
+            dags.append(dag)
+
+    def read(i):
+        return sdio.read_transfer_job(dags[i], captured, max_distance, min_dot)
+
+    for i, result in run_jobs(range(len(dags)), read, sdc.transfer_job, workers):
+        yield sdio.transfer_job_edit(dags[i], result)
+
+
+def apply_transfer(source, targets, max_distance=None, min_dot=0.5, workers=None):
+    """
+    Transfers and writes the normals for every target, each target is written as soon as it is done.
+    Run it inside a fast_edit so the whole transfer is one undo.
+    :return: None
+    """
+    for edit in transfer_edits(source, targets, max_distance, min_dot, workers):
+        sdio.apply_edits([edit])
+
+    return None
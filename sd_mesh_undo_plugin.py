@@ -0,0 +1,58 @@
+"""
+Undo plugin for the sd mesh tools
+created by: Sean Disero
+
+Registers the sdMeshEdit command. The tools build their edits in sd_mesh_io
+and then call the command, which picks up the pending edits and applies them
+as one entry in the undo queue. Undo and redo hand the stored arrays back to the
+edits so each is a single bulk write.
+
+This file is loaded automatically by sd_mesh_io.apply_edits, there is no need
+to load it through the plugin manager.
+
+License: MIT
+"""
+
+import maya.api.OpenMaya as om2
+
+
+def maya_useNewAPI():
+    pass
+
+
+class SDMeshEditCmd(om2.MPxCommand):
+    kCmdName = 'sdMeshEdit'
+
+    def __init__(self):
+        om2.MPxCommand.__init__(self)
+        self.edits = []
+
+    @staticmethod
+    def creator():
+        return SDMeshEditCmd()
+
+    def isUndoable(self):
+        return True
+
+    def doIt(self, args):
+        import sd_mesh_io
+        self.edits = sd_mesh_io.take_pending_edits()
+        self.redoIt()
+
+    def redoIt(self):
+        for edit in self.edits:
+            edit.redo()
+
+    def undoIt(self):
+        for edit in reversed(self.edits):
+            edit.undo()
+
+
+def initializePlugin(plugin):
+    fn_plugin = om2.MFnPlugin(plugin, 'Sean Disero', '1.0')
+    fn_plugin.registerCommand(SDMeshEditCmd.kCmdName, SDMeshEditCmd.creator)
+
+
+def uninitializePlugin(plugin):
+    fn_plugin = om2.MFnPlugin(plugin)
+    fn_plugin.deregisterCommand(SDMeshEditCmd.kCmdName)
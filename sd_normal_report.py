@@ -0,0 +1,199 @@
+"""
+Shading quality report for the sd normal tools
+created by: Sean Disero
+
+Checks the normals left by the hs tools without looking at every asset under the preview blinn.
+Every face vertex normal of a mesh is read in one go and compared to its face, giving per face
+max and mean angles, flipped and degenerate normals, and locked vs unlocked counts.
+A mesh fails when it goes over the limits, a scene fails when any of its meshes do.
+
+in maya:
+    import sd_normal_report
+    report = sd_normal_report.scene_report(max_angle=60)
+    sd_normal_report.write_report(report, 'C:/reports/asset.json')
+
+headless, to gate publishes. exits with 1 if any scene fails:
+    mayapy sd_normal_report.py --out C:/reports --max-angle 60 asset_a.ma asset_b.ma
+
+License: MIT
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+
+if __name__ == '__main__':
+    # run from mayapy, maya has to be started before the tools are imported.
+    import maya.standalone
+    maya.standalone.initialize(name='python')
+
+import maya.cmds as mc
+import maya.api.OpenMaya as om2
+
+import sd_compute as sdc
+import sd_mesh_io as sdio
+
+
+def mesh_report(dag, space=om2.MSpace.kObject, per_face=False):
+    """
+    Measures the shading of one mesh.
+    :param dag: MDagPath of the mesh.
+    :param per_face: Include the max and mean angle of every face.
+    :return: Dictionary that can be dumped to json.
+    """
+    start = time.time()
+    fn = om2.MFnMesh(dag)
+    offsets, vertex_ids = sdio.face_vertices(fn)
+    normals, locked = sdio.read_face_vertex_normals(fn, space)
+    result = sdc.normal_deviation(sdio.read_points(fn, space), offsets, vertex_ids, normals, locked)
+
+    angles = [a for a in result['max_angle'] if a >= 0]
+    means = [a for a in result['mean_angle'] if a >= 0]
+    report = {
+        'mesh': dag.fullPathName(),
+        'faces': len(offsets) - 1,
+        'face_vertices': len(vertex_ids),
+        'locked': result['locked'],
+        'unlocked': result['unlocked'],
+        'flipped': result['flipped'],
+        'flipped_faces': result['flipped_faces'].tolist(),
+        'degenerate_normals': result['degenerate_normals'],
+        'degenerate_faces': result['degenerate_faces'].tolist(),
+        'max_angle': max(angles) if angles else 0.0,
+        'mean_angle': sum(means) / len(means) if means else 0.0,
+    }
+    if per_face:
+        report['face_max_angle'] = result['max_angle'].tolist()
+        report['face_mean_angle'] = result['mean_angle'].tolist()
+
+    report['seconds'] = time.time() - start
+    return report
+
+
+def check(report, max_angle=None, allow_flipped=False, allow_degenerate=False):
+    """
+    Tests a mesh report against the publish limits.
+    :param max_angle: Largest angle allowed between a normal and its face, no limit if None.
+    :param allow_flipped: Pass meshes with normals pointing away from their faces.
+    :param allow_degenerate: Pass meshes with zero length normals or faces with no area.
+    :return: List of reasons the mesh fails, empty if it passes.
+    """
+    failures = []
+    if max_angle is not None and report['max_angle'] > max_angle:
+        failures.append('max angle {:.2f} is over {}'.format(report['max_angle'], max_angle))
+    if not allow_flipped and report['flipped']:
+        failures.append('{} flipped normals'.format(report['flipped']))
+    if not allow_degenerate and (report['degenerate_normals'] or report['degenerate_faces']):
+        failures.append('{} degenerate normals, {} degenerate faces'.format(
+            report['degenerate_normals'], len(report['degenerate_faces'])
+        ))
+    return failures
+
+
+def scene_report(nodes=None, per_face=False, **limits):
+    """
+    Reports on every mesh given, instanced shapes are only measured once.
+    :param nodes: Meshes or their transforms, every mesh in the scene if None.
+    :param per_face: Include per face angles in the mesh reports.
+    :param limits: Passed on to check.
+    :return: Dictionary with a report per mesh and the totals for the scene.
+    """
+    start = time.time()
+    if nodes is None:
+        nodes = mc.ls(type='mesh', noIntermediate=True, long=True) or []
+
+    meshes = []
+    for dag, faces in sdio.components_by_mesh(nodes):
+        report = mesh_report(dag, per_face=per_face)
+        report['failures'] = check(report, **limits)
+        report['passed'] = not report['failures']
+        meshes.append(report)
+
+    totals = dict(
+        (key, sum(m[key] for m in meshes))
+        for key in ('faces', 'face_vertices', 'locked', 'unlocked', 'flipped', 'degenerate_normals')
+    )
+    return {
+        'scene': mc.file(query=True, sceneName=True),
+        'maya_version': mc.about(version=True),
+        'time': time.time(),
+        'limits': limits,
+        'meshes': meshes,
+        'totals': totals,
+        'max_angle': max([m['max_angle'] for m in meshes] or [0.0]),
+        'failed': [m['mesh'] for m in meshes if not m['passed']],
+        'passed': all(m['passed'] for m in meshes),
+        'seconds': time.time() - start,
+    }
+
+
+def write_report(report, path, indent=2):
+    """
+    Writes a report to a json file, making its folder if needed.
+    """
+    folder = os.path.dirname(path)
+    if folder and not os.path.isdir(folder):
+        os.makedirs(folder)
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=indent, sort_keys=True)
+
+
+def batch_report(scenes, out_dir=None, per_face=False, **limits):
+    """
+    Opens each scene in turn and reports on all of its meshes.
+    Scenes that can't be opened are reported as failed.
+    :param scenes: Paths of the scene files.
+    :param out_dir: Folder to write a json report per scene to, nothing is written if None.
+    :return: Dictionary with the report of every scene.
+    """
+    reports = []
+    for scene in scenes:
+        try:
+            mc.file(scene, open=True, force=True, prompt=False)
+            report = scene_report(per_face=per_face, **limits)
+        except RuntimeError as ex:
+            report = {'scene': scene, 'error': str(ex), 'passed': False}
+
+        if out_dir:
+            name = os.path.splitext(os.path.basename(scene))[0]
+            write_report(report, os.path.join(out_dir, name + '.json'))
+
+        print '{} {}'.format('passed' if report['passed'] else 'FAILED', scene)
+        reports.append(report)
+
+    return {
+        'scenes': reports,
+        'failed': [r['scene'] for r in reports if not r['passed']],
+        'passed': all(r['passed'] for r in reports),
+    }
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='Shading quality report for maya scenes.')
+    parser.add_argument('scenes', nargs='+', help='scene files to check')
+    parser.add_argument('--out', help='folder to write a json report per scene to')
+    parser.add_argument('--summary', help='json file to write the report of every scene to')
+    parser.add_argument('--max-angle', type=float, help='largest angle allowed between a normal and its face')
+    parser.add_argument('--allow-flipped', action='store_true')
+    parser.add_argument('--allow-degenerate', action='store_true')
+    parser.add_argument('--per-face', action='store_true', help='include per face angles')
+    options = parser.parse_args(args)
+
+    result = batch_report(
+        options.scenes,
+        options.out,
+        options.per_face,
+        max_angle=options.max_angle,
+        allow_flipped=options.allow_flipped,
+        allow_degenerate=options.allow_degenerate
+    )
+    if options.summary:
+        write_report(result, options.summary)
+
+    return 0 if result['passed'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -2,18 +2,30 @@
 Utility functions created by: Sean Disero
 """
 import pymel.all as pm
+import maya.cmds as mc
 import maya.mel as mm
 from maya import OpenMaya as om
+import maya.api.OpenMaya as om2
 
 import random
+from array import array
 import os
-import sys
-import platform
+import time
 
 from pprint import pprint
 
 import sd_decorators as sdd
 reload(sdd)
+import sd_env_info
+reload(sd_env_info)
+import sd_compute as sdc
+reload(sdc)
+import sd_mesh_io as sdio
+reload(sdio)
+import sd_mesh_pipeline as sdmp
+reload(sdmp)
+import sd_journal as sdj
+reload(sdj)
 
 
 SCENE_PATH = pm.sceneName()
@@ -40,10 +52,16 @@ def _is_group(sel):
     :return: new list made up by the children of the selected group, or the original
     selection if selection is not a group.
     """
-    new_selection = [
-        _if_mesh_move_up(o) for o in pm.listRelatives(sel, children=True)
-        if o.type() == 'transform' or 'mesh'
-    ]
+    new_selection = []
+    seen = set()
+    for o in pm.listRelatives(sel, children=True):
+        if o.type() not in ('transform', 'mesh'):
+            continue
+        obj = _if_mesh_move_up(o)
+        # a transform and its shape can both be selected, only return it once.
+        if obj not in seen:
+            seen.add(obj)
+            new_selection.append(obj)
 
     return new_selection
 
@@ -56,13 +74,19 @@ def sd_test_type(selection, target_types):
             raise TypeError('Wrong type selected.')
 
 
+@sdd.sd_fast_edit
 @sdd.sd_preserve_selection
-def sd_weight_flat_surface(selection, obj_select=True, min_tolerance=0, max_tolerance=0):
+def sd_weight_flat_surface(selection, obj_select=True, min_tolerance=0, max_tolerance=0, regions=False,
+                           chunk_size=None):
     """
     if obj_select = True, hard surfaces (perfectly flat) will automatically be
     found and corrected, but only if model properly finished.
     min_tolerance = the minimum angle that will be selected.
     max_tolerance = the maximum angle that will be selected.
+    if regions = True, connected faces within the tolerance are clustered into
+    regions and each region gets one area weighted normal.
+    chunk_size = for huge meshes, the most faces worked on at once. the result is the same,
+    only the memory used changes. regions need the whole mesh at once and ignore it.
     """
 
     sd_test_type(selection, [pm.Transform, pm.MeshFace])
@@ -80,7 +104,7 @@ def sd_weight_flat_surface(selection, obj_select=True, min_tolerance=0, max_tole
         )
 
         # save the selection
-        oSel = pm.ls(sl=True, flatten=True)
+        oSel = pm.ls(sl=True)
 
         # turn off polySelectConstraint
         pm.polySelectConstraint(mode=0)
@@ -91,65 +115,55 @@ def sd_weight_flat_surface(selection, obj_select=True, min_tolerance=0, max_tole
         # convert to faces
         mm.eval('ConvertSelectionToFaces;')
 
-    fSel = pm.ls(sl=True, flatten=True)
+    # streamed one chunk of faces at a time, each chunk is written before the next is read.
+    if chunk_size and not regions:
+        for dag, chunks in sdio.stream_components(chunk_size=chunk_size):
+            for edit in sdio.flat_surface_edits(dag, chunks):
+                sdio.apply_edits([edit])
+        return
 
-    # create a good ol' progress bar
-    progWind = pm.window(title='progress')
-    pm.columnLayout()
+    # get the face normal of each face (or region) and apply it to the connected verts,
+    # with several meshes selected they are worked out in parallel and written as they finish.
+    mode = 'regions' if regions else 'flat'
+    sdmp.apply_normals(sdio.components_by_mesh(), mode, min_tolerance, max_tolerance)
 
-    progressControl = pm.progressBar(maxValue=len(fSel), width=300)
-
-    pm.showWindow(progWind)
-
-    # run through each object and get the face normal of each face
-    # apply the face normal direction to the connected verts
-    for face in fSel:
-        pm.select(face)
-        face_normal = face.getNormal(space='world')
-        verts = pm.polyListComponentConversion(
-            face,
-            fromFace=True,
-            toVertex=True
-        )
-
-        pm.select(verts)
-        pm.polyNormalPerVertex(normalXYZ=face_normal)
-
-        ff = fSel.index(face)
-        pm.progressBar(progressControl, edit=True, progress=ff)
-
-    pm.deleteUI(progWind)
 
+def sd_get_comp_info(timeout=1.0):
+    """
+    Readable version of sd_env_info.snapshot, use sd_env_info.snapshot_json for reports.
+    :param timeout: Seconds to wait for the slow probes.
+    :return: List of lines.
+    """
+    info = sd_env_info.snapshot(timeout=timeout, modules=False)
 
-def sd_get_comp_info():
     lines = []
     lines.append('Scene Info')
-    lines.append('  Maya Scene:  ' + pm.sceneName())
+    lines.append('  Maya Scene:  ' + info['scene']['name'])
 
     # Maya and Python versions
     lines.append('Maya/Python Info')
-    lines.append('  Maya Version:  ' + pm.about(version=True))
-    lines.append('  Qt Version:  ' + pm.about(qtVersion=True))
-    lines.append('  Maya64:  ' + str(pm.about(is64=True)))
-    lines.append('  PyVersion:  ' + sys.version)
-    lines.append('  PyExe:  ' + sys.executable)
+    lines.append('  Maya Version:  ' + info['maya']['version'])
+    lines.append('  Qt Version:  ' + info['maya']['qt_version'])
+    lines.append('  Maya64:  ' + str(info['maya']['is64']))
+    lines.append('  PyVersion:  ' + info['python']['version'])
+    lines.append('  PyExe:  ' + info['python']['executable'])
 
     # Information about the machine and OS.
     lines.append('Machine Info')
-    lines.append('  OS:  ' + pm.about(os=True))
-    lines.append('  Node:  ' + platform.node())
-    lines.append('  OSRelease:  ' + platform.release())
-    lines.append('  OSVersion:  ' + platform.version())
-    lines.append('  Machine:  ' + platform.machine())
-    lines.append('  Processor:  ' + platform.processor())
+    lines.append('  OS:  ' + info['maya']['os'])
+    lines.append('  Node:  ' + info['machine']['node'])
+    lines.append('  OSRelease:  ' + info['machine']['release'])
+    lines.append('  OSVersion:  ' + info['machine']['version'])
+    lines.append('  Machine:  ' + info['machine']['machine'])
+    lines.append('  Processor:  ' + str(info['machine']['processor']))
 
     # Information on the user's environment.
     lines.append('Environment Info')
     lines.append('  EnvVars')
-    for k in sorted(os.environ.keys()):
-        lines.append('  %s:  %s' % (k, os.environ[k]))
+    for k in sorted(info['environment']):
+        lines.append('  %s:  %s' % (k, info['environment'][k]))
     lines.append('  SysPath')
-    for p in sys.path:
+    for p in info['sys_path']:
         lines.append('    ' + p)
     return lines
 
@@ -188,7 +202,7 @@ def sd_list_attr():
                 continue
 
 
-def make_random_float(value, negative=True):
+def make_random_float(value, negative=True, rng=random):
     if negative:
         negative_value = -value
     else:
@@ -197,7 +211,83 @@ def make_random_float(value, negative=True):
     if value == 0:
         return 0
     else:
-        return random.uniform(negative_value, value)
+        return rng.uniform(negative_value, value)
+
+
+def sd_frame_range(start, end, step=1):
+    """
+    Key times from start to end, end is always included.
+    times are worked out from start each time so float error doesn't add up over the range.
+    """
+    if step <= 0:
+        raise ValueError('step must be greater than 0')
+
+    times = []
+    i = 0
+    t = float(start)
+    while t < end:
+        times.append(t)
+        i += 1
+        t = start + i * float(step)
+    times.append(float(end))
+    return times
+
+
+def sd_object_offsets(count, offset=0):
+    """
+    Time offsets for count objects.
+    :param offset: A number to stagger each object by that many frames after the last,
+    or a list with an offset for each object.
+    :return: List of offsets.
+    """
+    if isinstance(offset, (list, tuple)):
+        if len(offset) != count:
+            raise ValueError('there must be one offset per object')
+        return list(offset)
+    return [i * offset for i in range(count)]
+
+
+@sdd.sd_fast_edit
+def sd_bake_curves(targets, channels, times, offsets=None, tolerance=None, tangent='auto'):
+    """
+    Replaces the animation on the targets with new curves, every curve gets all of its keys
+    in one setAttr on its keyTimeValue array instead of a setKeyframe per frame.
+    :param targets: The transforms to key.
+    :param channels: Dictionary of attribute name to a flat list of values, object major,
+    so object i's values are values[i * len(times):(i + 1) * len(times)].
+    :param times: The key times shared by every object.
+    :param offsets: Time offset for each object, see sd_object_offsets.
+    :param tolerance: If set, keys a straight line already passes within tolerance of are dropped.
+    :param tangent: In and out tangent type of the keys.
+    :return: List of the curves made.
+    """
+    if offsets is None:
+        offsets = [0] * len(targets)
+
+    frame_count = len(times)
+    curves = []
+    for i, obj in enumerate(targets):
+        node = str(obj)
+        for attr, values in channels.items():
+            plug = '{}.{}'.format(node, attr)
+            obj_times = [t + offsets[i] for t in times]
+            obj_values = values[i * frame_count:(i + 1) * frame_count]
+            obj_times, obj_values = sdc.reduce_keys(obj_times, obj_values, tolerance)
+
+            old_curves = mc.listConnections(plug, source=True, destination=False, type='animCurve')
+            if old_curves:
+                mc.delete(old_curves)
+
+            curve_type = 'animCurveTA' if attr.startswith('rotate') else 'animCurveTL'
+            curve = mc.createNode(curve_type, name='{}_{}'.format(node.split('|')[-1], attr))
+
+            time_values = [x for key in zip(obj_times, obj_values) for x in key]
+            mc.setAttr('{}.ktv[0:{}]'.format(curve, len(obj_times) - 1), *time_values)
+            mc.keyTangent(curve, inTangentType=tangent, outTangentType=tangent)
+            mc.connectAttr(curve + '.output', plug, force=True)
+            curves.append(curve)
+
+    return curves
 
 
 def sd_move_to_origin(obj):
@@ -213,52 +303,38 @@ def sd_export_from_origin(obj):
     return old_position
 
 
-def sd_randomize_uvs(rand=0.3):
+@sdd.sd_fast_edit
+@sdj.recorded('sd_randomize_uvs')
+def sd_randomize_uvs(rand=0.3, seed=None, chunk_size=None):
     """
     After selecting uv's in the uv editor, this script will move
     around uv's randomly according to the object with which they belong.
     :param rand: The distance to be moved randomized between -rand and rand.
+    :param seed: Seed for the random numbers, None uses the global random state.
+    :param chunk_size: Most uvs moved at once, for huge meshes. None moves all of a mesh's uvs at once.
     :return: None
     """
     # Check if rand is a float or integer.
     if isinstance(rand, basestring):
         raise ValueError('please input a float or integer value')
 
+    rng = random if seed is None else random.Random(seed)
+
     # define selection.
-    o_sel = pm.ls(sl=True, flatten=True)
+    o_sel = pm.ls(sl=True)
 
     # Check if there are any objects in the selection that are not MeshUVs.
     non_mesh_uv_objects = [o for o in o_sel if not isinstance(o, pm.MeshUV)]
     if non_mesh_uv_objects:
         raise TypeError('please only select uv points')
 
-    # List the objects that the UVs belong to.
-    u_list = [o.name().split('.')[0] for o in o_sel]
-
-    # Create a Dictionary containing the objects and the UV vertices selected.
-    uv_coord_dict = {
-        o: [
-            u.index() for u in o_sel if o == u.name().split('.')[0]
-        ] for o in u_list
-    }
-
-    # Create random numbers relating to the objects selected.
-    random_nums = {
-        o: [
-            random.uniform(-rand, rand),
-            random.uniform(-rand, rand)
-        ] for o in u_list
-    }
-
-    # Cycle through the dictionary moving the object's contained UV vertices.
-    for uv in uv_coord_dict:
-        for vtx in uv_coord_dict[uv]:
-            pm.polyEditUV(
-                '{}.map[{}]'.format(uv, vtx),
-                u=random_nums[uv][0],
-                v=random_nums[uv][1],
-                relative=True
-            )
+    # Group the selected UVs by shape, instances share their UVs so they are only moved once.
+    # Each shape gets its own random offset and its UVs are moved in one go, or chunk by chunk.
+    for dag, chunks in sdio.stream_components(component_type=om2.MFn.kMeshMapComponent, chunk_size=chunk_size):
+        u = rng.uniform(-rand, rand)
+        v = rng.uniform(-rand, rand)
+        for uv_ids in chunks:
+            pm.polyEditUV(sdio.component_names(dag, 'map', uv_ids), u=u, v=v, relative=True)
 
     return None
 
@@ -328,14 +404,61 @@ class SDInterpolateTransform(object):
 
         return object_dict
 
+    @sdd.sd_fast_edit
     def interpolate_transform(self, percentage):
+        self.apply_values(self.interpolated_values(percentage))
+
+    def interpolated_values(self, percentage):
+        """
+        Works out the interpolated values without touching the scene,
+        so it is safe to call from a worker thread.
+        :param percentage: 0 - 100 of the stored values.
+        :return: List of (object, attribute, value).
+        """
         prcnt = percentage * 0.01
-        for obj in self.attr_dict:
-            o = self.attr_dict[obj]
-            for a in o:
-                val = a[1]
-                val = val * prcnt
-                obj.setAttr('{}'.format(a[0]), val)
+        return [
+            (obj, a[0], a[1] * prcnt)
+            for obj in self.attr_dict
+            for a in self.attr_dict[obj]
+        ]
+
+    def bake(self, start, end, step=1, stagger=0, tolerance=None):
+        """
+        Keys the interpolation over a frame range, going from 0 at start to the stored values at end.
+        :param start: First frame.
+        :param end: Last frame.
+        :param step: Frames between keys.
+        :param stagger: Frames each object starts after the last, or a list of offsets.
+        :param tolerance: Key reduction tolerance, see sd_bake_curves.
+        :return: List of the curves made.
+        """
+        targets = list(self.attr_dict)
+        times = sd_frame_range(start, end, step)
+        length = float(end - start) or 1.0
+        ramp = [(t - start) / length for t in times]
+
+        channels = dict((a, []) for a in self.attr_list)
+        for obj in targets:
+            for attr, val in self.attr_dict[obj]:
+                channels[attr].extend(val * r for r in ramp)
+
+        return sd_bake_curves(
+            targets, channels, times, sd_object_offsets(len(targets), stagger), tolerance
+        )
+
+    @staticmethod
+    def apply_values(values, start=0, end=None):
+        """
+        Sets the values made by interpolated_values.
+        :param values: List of (object, attribute, value).
+        :param start: First item to set.
+        :param end: Item to stop at, the end of the list if None.
+        :return: None
+        """
+        for obj, attr, val in values[start:end]:
+            obj.setAttr(attr, val)
+
+        return None
 
 
 class SDRandomXform(object):
@@ -345,7 +468,11 @@ class SDRandomXform(object):
     the transforms must be frozen.
     """
 
-    def __init__(self, rx=0, ry=0, rz=0, tz=0, negative_values=True):
+    CHANNELS = ('rotateX', 'rotateY', 'rotateZ', 'translateZ')
+
+    @sdd.sd_fast_edit
+    @sdj.recorded('SDRandomXform', replay=lambda **kw: SDRandomXform(**kw))
+    def __init__(self, rx=0, ry=0, rz=0, tz=0, negative_values=True, seed=None):
 
         self.o_sel = pm.ls(sl=True, flatten=True)
 
@@ -355,11 +482,69 @@ class SDRandomXform(object):
 
         self.z_tr = tz
 
-        self.random_rotation_x(self.o_sel, self.x_rot, negative_values)
-        self.random_rotation_y(self.o_sel, self.y_rot, negative_values)
-        self.random_rotation_z(self.o_sel, self.z_rot, negative_values)
+        targets = _is_group(self.o_sel)
+        values = self.make_values(len(targets), rx, ry, rz, tz, negative_values, seed)
+        self.apply_values(targets, values)
+
+    @classmethod
+    def make_values(cls, count, rx=0, ry=0, rz=0, tz=0, negative_values=True, seed=None):
+        """
+        Makes the random values for count objects without touching the scene,
+        so it is safe to call from a worker thread.
+        :param count: Number of objects.
+        :param seed: Seed for the random numbers, None uses the global random state.
+        :return: Dictionary of channel name to a list of values, one per object.
+        """
+        rng = random if seed is None else random.Random(seed)
 
-        self.random_translation_z(self.o_sel, self.z_tr, negative_values)
+        values = {}
+        for channel, value in zip(cls.CHANNELS, (rx, ry, rz, tz)):
+            values[channel] = [make_random_float(value, negative_values, rng) for _ in range(count)]
+
+        return values
+
+    @classmethod
+    def bake(cls, start, end, step=1, rx=0, ry=0, rz=0, tz=0, negative_values=True, seed=None,
+             offset=0, tolerance=None):
+        """
+        Keys random values on the selection over a frame range, a new random value every step frames.
+        :param start: First frame.
+        :param end: Last frame.
+        :param step: Frames between random keys.
+        :param seed: Seed for the random numbers, None uses the global random state.
+        :param offset: Frames each object starts after the last, or a list of offsets.
+        :param tolerance: Key reduction tolerance, see sd_bake_curves.
+        :return: List of the curves made.
+        """
+        targets = _is_group(pm.ls(sl=True, flatten=True))
+        times = sd_frame_range(start, end, step)
+
+        # one value per object per key, object major, so each channel is a single list.
+        values = cls.make_values(len(targets) * len(times), rx, ry, rz, tz, negative_values, seed)
+
+        return sd_bake_curves(
+            targets, values, times, sd_object_offsets(len(targets), offset), tolerance
+        )
+
+    @classmethod
+    def apply_values(cls, targets, values, start=0, end=None):
+        """
+        Sets the values made by make_values.
+        :param targets: The transforms, in the same order the values were made for.
+        :param values: Dictionary of channel name to a list of values.
+        :param start: First object to set.
+        :param end: Object to stop at, the end of the list if None.
+        :return: None
+        """
+        if end is None:
+            end = len(targets)
+
+        for i in range(start, end):
+            obj = targets[i]
+            for channel in cls.CHANNELS:
+                obj.setAttr(channel, values[channel][i])
+
+        return None
 
     @staticmethod
     def random_rotation_x(selection, x_val, use_negative_values=True):
@@ -441,81 +626,195 @@ class SDRandomXform(object):
 
 class SDRandomOffset(object):
 
-    def __init__(self, x=0, y=0, z=0):
-        self.o_sel = pm.ls(sl=True, flatten=True)
+    @sdd.sd_fast_edit
+    def __init__(self, x=0, y=0, z=0, chunk_size=None):
+        # vertex ranges are kept as ranges, flattening millions of vertices into PyNodes is slow.
+        self.o_sel = pm.ls(sl=True)
 
         self.x_val = x
         self.y_val = y
         self.z_val = z
 
-        self.sd_random_y_offset(self.o_sel, self.y_val)
+        self.sd_random_y_offset(self.o_sel, self.y_val, chunk_size=chunk_size)
 
     @staticmethod
-    def sd_random_y_offset(selection, y_value, both_directions=True):
+    def sd_random_y_offset(selection, y_value, both_directions=True, chunk_size=None):
         """
         Randomly offsets objects in the range of -n to n where n is the y_value if both_directions is True
+        Selected vertices have their y tweak set instead, all the vertices of a mesh are written in one go.
         :param selection: The current selection.
         :param y_value: -n to n where n is y_value
         :param both_directions: clamps the range to 0 to n where n is y_value
+        :param chunk_size: Most vertices written at once, for huge meshes. None writes a whole mesh at once.
         :return: None
         """
+        def y_random():
+            if y_value == 0:
+                return 0
+            value = random.uniform(-y_value, y_value)
+            return value if both_directions else abs(value)
+
         # for obj in _is_group(selection):
         for obj in selection:
-            pm.select(obj)
+            if type(obj) != pm.MeshVertex:
+                obj.setAttr('translateY', y_random())
+
+        # the offset replaces the vertex's y tweak, like setting pnty would.
+        vertices = [obj for obj in selection if type(obj) == pm.MeshVertex]
+        for dag, chunks in sdio.stream_components(vertices, om2.MFn.kMeshVertComponent, chunk_size):
+            for vertex_ids in chunks:
+                points = sdio.read_points_at(om2.MFnMesh(dag), vertex_ids)
+                tweaks = sdio.read_tweaks(dag, vertex_ids)
+                moved = array('d')
+                for i in range(len(vertex_ids)):
+                    x, y, z = points[i * 3:i * 3 + 3]
+                    moved.extend((x, y - tweaks[i * 3 + 1] + y_random(), z))
+                del points, tweaks
+                sdio.apply_edits([sdio.PointEdit(dag, vertex_ids, moved)])
 
-            if y_value == 0:
-                y_random = 0
-            else:
-                y_random = random.uniform(-y_value, y_value)
+        return None
 
-            if not both_directions:
-                y_random = abs(y_random)
 
-            if type(obj) == pm.MeshVertex:
-                pm.setAttr('{}.pnty'.format(obj), y_random)
-            else:
-                obj.setAttr('translateY', y_random)
+class SDScatter(object):
+    """
+    Randomly offsets the selected transforms without letting them overlap.
+    Each object is treated as a sphere around its bounding box, objects that can't find
+    a free spot within their range are left where they are and listed in self.failed.
+    """
 
-        pm.select(selection)
-        return None
+    @sdd.sd_fast_edit
+    def __init__(self, x=0, y=0, z=0, seed=None, attempts=30, padding=0):
+        self.o_sel = pm.ls(sl=True, flatten=True)
+
+        self.failed = self.sd_scatter(_is_group(self.o_sel), (x, y, z), seed, attempts, padding)
+
+    @staticmethod
+    def sd_scatter(selection, ranges, seed=None, attempts=30, padding=0):
+        """
+        Offsets objects in the range of -n to n on each axis, keeping a minimum distance between them.
+        :param selection: The transforms to scatter.
+        :param ranges: (x, y, z) the n value of each axis.
+        :param seed: Seed for the random numbers.
+        :param attempts: Number of random offsets tried for each object.
+        :param padding: Extra space to keep around every object.
+        :return: List of the objects that couldn't be placed.
+        """
+        nodes = [str(o) for o in selection]
+
+        centers = []
+        radii = []
+        for node in nodes:
+            bb = mc.exactWorldBoundingBox(node)
+            centers.extend(((bb[0] + bb[3]) * 0.5, (bb[1] + bb[4]) * 0.5, (bb[2] + bb[5]) * 0.5))
+            radii.append(0.5 * ((bb[3] - bb[0]) ** 2 + (bb[4] - bb[1]) ** 2 + (bb[5] - bb[2]) ** 2) ** 0.5 + padding)
+
+        offsets, failed = sdc.scatter(centers, radii, ranges, seed, attempts)
+
+        # the offsets are in world space, the translates of the moved objects are all set in one edit.
+        plugs = []
+        before = array('d')
+        after = array('d')
+        for i, node in enumerate(nodes):
+            offset = offsets[i * 3:i * 3 + 3]
+            if not any(offset):
+                continue
+            sel = om2.MSelectionList()
+            sel.add(node)
+            move = om2.MVector(offset[0], offset[1], offset[2]) * sel.getDagPath(0).exclusiveMatrixInverse()
+            translate = mc.getAttr(node + '.translate')[0]
+            plugs.extend((node + '.translateX', node + '.translateY', node + '.translateZ'))
+            before.extend(translate)
+            after.extend((translate[0] + move.x, translate[1] + move.y, translate[2] + move.z))
+        sdio.apply_edits([sdio.AttrEdit(plugs, before, after)])
+
+        if failed:
+            pm.displayWarning('{} objects could not be placed without overlapping'.format(len(failed)))
+
+        return [selection[i] for i in failed]
 
 
 class SDTransferAttrs(object):
+    """
+    Transfers UVs from the first selected object onto every other selected object.
+    All the transfers are set up first, evaluated together and then the history of every
+    target is collapsed in one go. self.report has the timings and errors of each target.
+    """
 
-    def __init__(self):
+    @sdd.sd_fast_edit
+    def __init__(self, source_uv_set='tiling', target_uv_set='map1', sample_space=5, search_method=3):
         self.o_sel = pm.ls(sl=True)
 
-        self.sd_transfer_attributes(self.o_sel)
+        self.source_uv_set = source_uv_set
+        self.target_uv_set = target_uv_set
+        self.sample_space = sample_space
+        self.search_method = search_method
+
+        self.report = self.sd_transfer_attributes(self.o_sel)
 
     def sd_transfer_attributes(self, selection):
+        """
+        :param selection: The source followed by the targets.
+        :return: Dictionary of target name to its create and evaluate times in seconds and any error.
+        """
+        source = str(selection[0])
+        targets = [str(o) for o in selection[1:]]
 
-        new_sel = selection.pop(0)
+        report = dict((t, {'create': 0.0, 'evaluate': 0.0, 'error': None}) for t in targets)
 
-        for obj in selection:
-            transfer_from = [new_sel, obj]
+        # set up every transfer before anything is evaluated.
+        transfer_nodes = {}
+        for target in targets:
+            start = time.time()
+            try:
+                transfer_nodes[target] = mc.transferAttributes(
+                    source,
+                    target,
+                    transferPositions=0,
+                    transferNormals=0,
+                    transferUVs=1,
+                    sourceUvSet=self.source_uv_set,
+                    targetUvSet=self.target_uv_set,
+                    transferColors=0,
+                    sampleSpace=self.sample_space,
+                    sourceUvSpace=self.source_uv_set,
+                    targetUvSpace=self.target_uv_set,
+                    searchMethod=self.search_method,
+                    flipUVs=0,
+                    colorBorders=1
+                )[0]
+            except RuntimeError as ex:
+                report[target]['error'] = str(ex)
+            report[target]['create'] = time.time() - start
+
+        for target, node in transfer_nodes.items():
+            start = time.time()
+            try:
+                mc.dgeval(node)
+            except RuntimeError as ex:
+                report[target]['error'] = str(ex)
+            report[target]['evaluate'] = time.time() - start
+
+        # one history collapse for every target.
+        if transfer_nodes:
+            mc.delete(list(transfer_nodes), constructionHistory=True)
 
-            pm.select(transfer_from)
+        failed = sorted(t for t in targets if report[t]['error'])
+        if failed:
+            pm.displayWarning('{} of {} transfers failed: {}'.format(len(failed), len(targets), ', '.join(failed)))
 
-            pm.transferAttributes(
-                transferPositions=0,
-                transferNormals=0,
-                transferUVs=1,
-                sourceUvSet="tiling",
-                targetUvSet="map1",
-                transferColors=0,
-                sampleSpace=5,
-                sourceUvSpace="tiling",
-                targetUvSpace="map1",
-                searchMethod=3,
-                flipUVs=0,
-                colorBorders=1
-            )
+        return report
 
-            pm.delete(ch=True)
+    def slowest(self, count=10):
+        """
+        :return: The count slowest targets as (seconds, name), slowest first.
+        """
+        times = [(r['create'] + r['evaluate'], t) for t, r in self.report.items()]
+        return sorted(times, reverse=True)[:count]
 
 
 class SDChangeHarDriveNameForTex(object):
 
+    @sdd.sd_fast_edit
     def __init__(self, hard_drive=None):
 
         self.selection = pm.ls(sl=True)
@@ -1,3 +1,7 @@
+import random
+import threading
+import time
+
 from PySide2 import QtWidgets
 from PySide2 import QtCore
 from PySide2 import QtGui
@@ -7,9 +11,13 @@ from shiboken2 import wrapInstance
 from maya import OpenMayaUI as omui
 
 import pymel.all as pm
+import maya.cmds as mc
+import maya.api.OpenMaya as om2
 
 import sd_utils
 reload(sd_utils)
+import sd_journal as sdj
+import sd_mesh_io
 
 
 def get_maya_main_window():
@@ -23,6 +31,110 @@ def get_maya_main_window():
     return ptr
 
 
+class SDChunkedJob(QtCore.QObject):
+    """
+    Sets a long list of attribute values in small time slices from the Qt event loop so maya stays responsive.
+    prepare is run on a worker thread, it must not touch maya and returns a list of (node, attribute, value).
+    values are set through the api while the job runs so nothing goes in the undo queue, anything the
+    user does in the meantime stays separate. when the job completes the whole job is added as one undo.
+    a cancelled job puts back the values it had already set.
+    """
+    progress = QtCore.Signal(int, int)
+    finished = QtCore.Signal(bool)
+
+    def __init__(self, prepare, slice_seconds=0.02, batch_size=25, parent=None):
+        super(SDChunkedJob, self).__init__(parent)
+
+        self.prepare = prepare
+        self.slice_seconds = slice_seconds
+        self.batch_size = batch_size
+
+        self.items = None
+        self.index = 0
+
+        # what has been set so far, the before values are what cancel puts back.
+        self.plugs = []
+        self.before = []
+        self.after = []
+
+        self._error = None
+        self._cancelled = False
+        self._thread = None
+
+        self._timer = QtCore.QTimer(self)
+        self._timer.setInterval(0)
+        self._timer.timeout.connect(self._step)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run_prepare)
+        self._thread.daemon = True
+        self._thread.start()
+        self._timer.start()
+
+    def cancel(self):
+        self._cancelled = True
+        if self.is_running():
+            self._finish(False)
+
+    def is_running(self):
+        return self._timer.isActive()
+
+    def _run_prepare(self):
+        try:
+            self.items = self.prepare()
+        except Exception as ex:
+            self._error = ex
+
+    def _apply(self, start, end):
+        for node, attr, value in self.items[start:end]:
+            plug = '{}.{}'.format(node, attr)
+            sel = om2.MSelectionList()
+            sel.add(plug)
+            self.before.append(mc.getAttr(plug))
+            sd_mesh_io.set_plug_value(sel.getPlug(0), value)
+            self.plugs.append(plug)
+            self.after.append(value)
+
+    def _step(self):
+        if self._cancelled:
+            self._finish(False)
+            return
+
+        # wait for the worker thread to hand over the items.
+        if self._thread.is_alive():
+            return
+
+        if self._error is not None:
+            self._finish(False)
+            raise self._error
+
+        total = len(self.items)
+        deadline = time.time() + self.slice_seconds
+        try:
+            while self.index < total and time.time() < deadline:
+                end = min(self.index + self.batch_size, total)
+                self._apply(self.index, end)
+                self.index = end
+        except Exception:
+            self._finish(False)
+            raise
+
+        self.progress.emit(self.index, total)
+
+        if self.index >= total:
+            self._finish(True)
+
+    def _finish(self, completed):
+        self._timer.stop()
+        edit = sd_mesh_io.AttrEdit(self.plugs, self.before, self.after)
+        self.plugs, self.before, self.after = [], [], []
+        if completed:
+            sd_mesh_io.apply_edits([edit])
+        else:
+            edit.undo()
+        self.finished.emit(completed)
+
+
 class SDRandomXformUI(QtWidgets.QDialog):
 
     def __init__(self):
@@ -38,6 +150,15 @@ class SDRandomXformUI(QtWidgets.QDialog):
 
         self.interpolation_dict = self.sd.SDInterpolateTransform()
 
+        # The job currently running, only one runs at a time.
+        self.job = None
+
+        # Slider moves are collected and only the latest value is run.
+        self.slider_timer = QtCore.QTimer(self)
+        self.slider_timer.setSingleShot(True)
+        self.slider_timer.setInterval(50)
+        self.slider_timer.timeout.connect(self.run_interpolation)
+
         # Set the title and width of the window.
         self.setWindowTitle('Random Xform')
 
@@ -105,7 +226,6 @@ class SDRandomXformUI(QtWidgets.QDialog):
         randomize_btn = QtWidgets.QPushButton()
         randomize_btn.setText('Randomize')
         randomize_btn.clicked.connect(self.randomize)
-        randomize_btn.clicked.connect(self.build_sd_interpolation)
         rotation_layout_box.addWidget(randomize_btn, 4, 1)
 
         self.interpolate_slider = QtWidgets.QSlider()
@@ -113,9 +233,71 @@ class SDRandomXformUI(QtWidgets.QDialog):
         self.interpolate_slider.setMinimum(0)
         self.interpolate_slider.setMaximum(100)
         self.interpolate_slider.setValue(100)
-        self.interpolate_slider.valueChanged.connect(self.run_interpolation)
+        self.interpolate_slider.valueChanged.connect(lambda value: self.slider_timer.start())
         layout.addWidget(self.interpolate_slider)
 
+        progress_layout_widget = QtWidgets.QWidget()
+        progress_layout_box = QtWidgets.QHBoxLayout(progress_layout_widget)
+        progress_layout_box.setMargin(0)
+        layout.addWidget(progress_layout_widget)
+
+        self.progress_bar = QtWidgets.QProgressBar()
+        progress_layout_box.addWidget(self.progress_bar)
+
+        self.cancel_btn = QtWidgets.QPushButton()
+        self.cancel_btn.setText('Cancel')
+        self.cancel_btn.clicked.connect(self.cancel_job)
+        progress_layout_box.addWidget(self.cancel_btn)
+
+        progress_layout_widget.setVisible(False)
+        self.progress_widget = progress_layout_widget
+
+    def start_job(self, prepare, on_complete=None):
+        """
+        Cancels whatever job is running and starts a new one with the progress bar showing.
+        """
+        self.cancel_job()
+
+        job = SDChunkedJob(prepare)
+        job.progress.connect(self.update_progress)
+        job.finished.connect(lambda completed: self.job_finished(job, completed, on_complete))
+
+        # the job isn't a child of the window, so when the window is deleted (eg. by reopening it)
+        # it is still around to put back what it had set.
+        def window_destroyed(*args):
+            job.blockSignals(True)
+            job.cancel()
+        self.parent().destroyed.connect(window_destroyed)
+        # kept so it can be disconnected when the job is done, it holds on to the job and its items.
+        job.window_destroyed = window_destroyed
+
+        self.job = job
+        self.progress_bar.setValue(0)
+        self.progress_widget.setVisible(True)
+        job.start()
+
+    def cancel_job(self):
+        if self.job:
+            self.job.cancel()
+
+    def closeEvent(self, event):
+        self.cancel_job()
+        super(SDRandomXformUI, self).closeEvent(event)
+
+    def update_progress(self, done, total):
+        self.progress_bar.setMaximum(max(total, 1))
+        self.progress_bar.setValue(done)
+
+    def job_finished(self, job, completed, on_complete=None):
+        self.parent().destroyed.disconnect(job.window_destroyed)
+        job.window_destroyed = None
+        if job is not self.job:
+            return
+        self.job = None
+        self.progress_widget.setVisible(False)
+        if completed and on_complete:
+            on_complete()
+
     def randomize(self):
         x_rot = self.check_and_make_float(self.x_rot_box.text())
         y_rot = self.check_and_make_float(self.y_rot_box.text())
@@ -123,7 +305,26 @@ class SDRandomXformUI(QtWidgets.QDialog):
 
         z_tras = self.check_and_make_float(self.z_tr_box.text())
 
-        self.sd.SDRandomXform(x_rot, y_rot, z_rot, z_tras)
+        random_xform = self.sd.SDRandomXform
+        targets = self.sd._is_group(pm.ls(sl=True, flatten=True))
+
+        # the seed is kept so the journal can replay exactly these values.
+        params = dict(rx=x_rot, ry=y_rot, rz=z_rot, tz=z_tras, seed=random.randrange(1 << 30))
+        journal_targets = sdj.selection_targets() if sdj.is_recording() else []
+
+        def prepare():
+            values = random_xform.make_values(len(targets), **params)
+            return [
+                (obj, channel, values[channel][i])
+                for i, obj in enumerate(targets)
+                for channel in random_xform.CHANNELS
+            ]
+
+        def on_complete():
+            sdj.record('SDRandomXform', params, journal_targets)
+            self.build_sd_interpolation()
+
+        self.start_job(prepare, on_complete=on_complete)
 
     def check_and_make_float(self, value):
         if not value:
@@ -138,4 +339,6 @@ class SDRandomXformUI(QtWidgets.QDialog):
 
     def run_interpolation(self):
         prc = self.interpolate_slider.value()
-        self.interpolation_dict.interpolate_transform(percentage=prc)
\ No newline at end of file
+        interpolation = self.interpolation_dict
+
+        self.start_job(lambda: interpolation.interpolated_values(percentage=prc))